@@ -1,9 +1,10 @@
 from clis.adcode import get_adcode
-from clis.binary import generate_bits, generate_chars
+from clis.bench import run_benchmark
+from clis.binary import generate_bits, generate_chars, hash_files, transcode_base, dump_hex
 from clis.configurator import configurate
 from clis.datetime import enum_date, enum_datetime
-from clis.frp import run_frpc, run_frps
-from clis.idcard import enum_prcid
+from clis.frp import run_frpc, run_frps, manage_frp
+from clis.idcard import enum_prcid, prcid_tools
 from clis.sequence import product_columns
 from clis.util import split_url, encode_uri, decode_uri, get_length, run_command
 
@@ -11,9 +12,13 @@ interface_list = [
     get_adcode,
     generate_bits,
     generate_chars,
+    hash_files,
+    transcode_base,
+    dump_hex,
     enum_date,
     enum_datetime,
     enum_prcid,
+    prcid_tools,
     product_columns,
     split_url,
     encode_uri,
@@ -22,5 +27,7 @@ interface_list = [
     configurate,
     run_frpc,
     run_frps,
+    manage_frp,
     run_command,
+    run_benchmark,
 ]
@@ -1,10 +1,12 @@
 import re
+from functools import lru_cache
 from json import load as json_load
 from pathlib import Path
 
 import click
 
 from core.click_chore import Regex
+from core.timing import span
 
 code_detail = """
   {p}-{c}-{k}-{t}-{o}
@@ -16,6 +18,8 @@ code_detail = """
 """
 
 
+@lru_cache(maxsize=1)
+@span('dataset')
 def lazy_load():
     # 数据来源：http://www.stats.gov.cn/tjsj/tjbz/tjyqhdmhcxhfdm/2022/index.html
     path = Path(__file__).parent.parent / 'code2022.json'
@@ -23,6 +27,16 @@ def lazy_load():
         return json_load(f)
 
 
+def warm_up():
+    """
+    预先加载区划代码，供常驻进程使用。数据文件不存在时跳过。
+    """
+    try:
+        lazy_load()
+    except FileNotFoundError:
+        pass
+
+
 def search_code(a, b, _code, codes_map):
     """
     搜索区划代码。
@@ -0,0 +1,320 @@
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from multiprocessing import get_context
+from pathlib import Path
+from statistics import median
+from typing import NamedTuple, Callable, Final, Any, NoReturn
+from urllib.parse import quote
+
+import click
+from rich import box
+from rich.console import Console
+from rich.table import Table
+from rich.text import Text
+
+from core.click_chore import fmt_datasize
+from core.style import *
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROJECT_ROOT: Final = Path(__file__).parent.parent
+WORDS: Final = ('yudo', '命令行', 'frp', 'click', 'rich', '身份证', 'url', '编码', 'python', '区划')
+
+
+def _fixture_product(directory: Path, rng: random.Random) -> int:
+    first = date(1990, 1, 1)
+    columns = {
+        'codes.txt': (f'{110101 + i}' for i in range(10)),
+        'births.txt': ((first + timedelta(days=i)).strftime('%Y%m%d') for i in range(100)),
+        'seqs.txt': (f'{i:03d}' for i in range(1, 100 + 1)),
+    }
+    for name, lines in columns.items():
+        (directory / name).write_text('\n'.join(lines) + '\n', encoding='UTF-8')
+    return 10 * 100 * 100
+
+
+def _fixture_urls(directory: Path, rng: random.Random) -> int:
+    hosts = [f'{w}.example.com' for w in ('www', 'api', 'cdn', 'static', 'm')]
+    lines = (
+        f'https://{rng.choice(hosts)}:{rng.choice((443, 8443))}/{rng.choice(WORDS)}/{i}'
+        f'?id={i}&q={rng.choice(WORDS)}&page={rng.randrange(100)}#top'
+        for i in range(100_000)
+    )
+    (directory / 'urls.txt').write_text('\n'.join(lines) + '\n', encoding='UTF-8')
+    return 100_000
+
+
+def _fixture_text(directory: Path, rng: random.Random) -> int:
+    lines = [' '.join(rng.choices(WORDS, k=8)) + f' {i}' for i in range(100_000)]
+    (directory / 'text.txt').write_text('\n'.join(lines) + '\n', encoding='UTF-8')
+    (directory / 'encoded.txt').write_text('\n'.join(map(quote, lines)) + '\n', encoding='UTF-8')
+    return 100_000
+
+
+class BenchCase(NamedTuple):
+    name: str
+    argv: tuple[str, ...]
+    fixture: Callable[[Path, random.Random], int] | None = None
+    requires: str | None = None
+
+    def arguments(self, directory: Path) -> list[str]:
+        return [arg.format(dir=directory) for arg in self.argv]
+
+
+# 参数中的 {dir} 会替换为存放 fixture 生成的输入文件的临时目录
+CASES: Final = {
+    case.name: case for case in (
+        BenchCase('enumd', ('enumd', '-F', '-i', '1900.01.01~2099.12.31')),
+        BenchCase('enumdt', ('enumdt', '-F', '-t', '1672502400~1672588800,+0800')),
+        BenchCase('enumdt-epoch', ('enumdt', '-F', '-e', 'ms', '-s', '100ms', '-t', '1672502400~1672588800,+0800')),
+        BenchCase('enumdt-sample', ('enumdt', '-F', '-m', '--sample', '100000', '--seed', '0', '-t', '0~1e9,+0000')),
+        BenchCase('enumidc', ('enumidc', '-f', '-p', '11', '-y', '1990', '-m', '1', '-M'), requires='code2022.json'),
+        BenchCase('product', ('product', '-F', '--patch-prc-sum',
+                              '{dir}/codes.txt', '{dir}/births.txt', '{dir}/seqs.txt'), _fixture_product),
+        BenchCase('randbit', ('randbit', '256', '-q', '200000')),
+        BenchCase('hash', ('hash', '-a', 'SHA-256', '-a', 'MD5', '-a', 'SM3', '{dir}/text.txt'), _fixture_text),
+        BenchCase('randstr', ('randstr', '2000000', '-c', 'base62', '-m', '100')),
+        BenchCase('adc', ('adc', '-p', '11'), requires='code2022.json'),
+        BenchCase('url', ('url', '-b', '{dir}/urls.txt'), _fixture_urls),
+        BenchCase('url-aggregate', ('url', '-a', '{dir}/urls.txt'), _fixture_urls),
+        BenchCase('urlen', ('urlen', '{dir}/text.txt'), _fixture_text),
+        BenchCase('urlde', ('urlde', '{dir}/encoded.txt'), _fixture_text),
+        BenchCase('len', ('len', '{dir}/text.txt'), _fixture_text),
+    )
+}
+# 测量导入耗时的模块：clis 是 yu 的全部命令，core.daemon 是 yuc 客户端需要的全部
+IMPORTS: Final = ('clis', 'core.daemon')
+
+
+def peak_rss() -> int | None:
+    """
+    当前进程的内存占用峰值（字节）。不支持的平台返回 None。
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _count_lines(f) -> tuple[int, int]:
+    f.seek(0)
+    lines = size = 0
+    while chunk := f.read(1 << 20):
+        lines += chunk.count(b'\n')
+        size += len(chunk)
+    f.seek(0)
+    f.truncate()
+    return lines, size
+
+
+def run_case(name: str, repeat: int, warmup: int, seed: int) -> dict[str, Any]:
+    """
+    在当前进程中运行一项测试，标准输出重定向到临时文件。应当在独立的子进程中调用，以便单独统计内存峰值。
+
+    :return: 每次计时、输出的行数和字节数、内存峰值。
+    """
+    from clis import interface_list
+
+    case = CASES[name]
+    commands = {c.name: c for c in interface_list}
+    command = commands[case.argv[0]]
+    with tempfile.TemporaryDirectory(prefix='yu-bench-') as directory, tempfile.TemporaryFile() as sink:
+        directory = Path(directory)
+        inputs = case.fixture(directory, random.Random(seed)) if case.fixture else None
+        argv = case.arguments(directory)[1:]
+
+        sys.stdout.flush()
+        saved = os.dup(1)
+        os.dup2(sink.fileno(), 1)
+        times = []
+        try:
+            for i in range(warmup + repeat):
+                random.seed(seed)
+                start = time.perf_counter()
+                command.main(argv, prog_name=f'yu {command.name}', standalone_mode=False)
+                sys.stdout.flush()
+                elapsed = time.perf_counter() - start
+                lines, size = _count_lines(sink)
+                if i >= warmup:
+                    times.append(elapsed)
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved, 1)
+            os.close(saved)
+
+    return {
+        'times': times,
+        'rows': inputs if inputs is not None else lines,
+        'output': size,
+        'peak_rss': peak_rss(),
+    }
+
+
+def measure_import(module: str, repeat: int) -> float:
+    """
+    在全新的解释器中导入模块，返回多次测量中最快的耗时（秒）。
+    """
+    code = f'import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)'
+    return min(
+        float(subprocess.run(
+            [sys.executable, '-c', code], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout)
+        for _ in range(repeat)
+    )
+
+
+def run_benchmarks(names: tuple[str, ...], repeat: int, warmup: int, seed: int) -> dict[str, Any]:
+    """
+    逐项在新的子进程中运行测试，并测量导入耗时。
+
+    :return: 可以直接保存为 JSON 的结果。
+    """
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'cases': {},
+        'imports': {m: measure_import(m, repeat) for m in IMPORTS},
+    }
+    for name in names:
+        case = CASES[name]
+        if case.requires and not (PROJECT_ROOT / case.requires).exists():
+            report['cases'][name] = {'skipped': f'缺少 {case.requires}'}
+            continue
+        # 每项测试都用全新的进程，互不影响内存峰值和缓存
+        with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as executor:
+            try:
+                result = executor.submit(run_case, name, repeat, warmup, seed).result()
+            except Exception as e:
+                report['cases'][name] = {'error': f'{e.__class__.__name__}: {e}'}
+                continue
+        best = min(result['times'])
+        result.update(
+            best=best,
+            median=median(result['times']),
+            rows_per_sec=result['rows'] / best if best > 0 else None,
+        )
+        report['cases'][name] = result
+    return report
+
+
+def compare(report: dict, baseline: dict) -> dict[str, dict[str, float]]:
+    """
+    与基线比较耗时、内存峰值和导入耗时。
+
+    :return: {测试项: {指标: 相对基线的变化比例}}，只包含两边都有的测试项和指标。
+    """
+    changes = {}
+    pairs = [
+        (name, result, baseline.get('cases', {}).get(name, {}))
+        for name, result in report['cases'].items()
+    ] + [
+        (f'import {m}', {'best': t}, {'best': baseline.get('imports', {}).get(m)})
+        for m, t in report['imports'].items()
+    ]
+    for name, result, base in pairs:
+        for metric in ('best', 'peak_rss'):
+            if result.get(metric) and base.get(metric):
+                changes.setdefault(name, {})[metric] = result[metric] / base[metric] - 1
+    return changes
+
+
+def _fmt_change(change: float | None, threshold: float) -> Text:
+    if change is None:
+        return Text('')
+    style = PT_ERROR if change > threshold else PT_SUCCESS if change < -threshold else ''
+    return Text(f'{change:+.1%}', style=style)
+
+
+def print_report(report: dict, changes: dict | None, threshold: float) -> NoReturn:
+    columns = ['测试项', '行数', '最快', '中位数', '行/秒', '内存峰值']
+    if changes is not None:
+        columns += ['耗时Δ', '内存Δ']
+    table = Table(*columns, box=box.SIMPLE_HEAD)
+    for name, result in report['cases'].items():
+        if 'best' not in result:
+            table.add_row(name, Text(result.get('skipped') or result.get('error'), style=PT_WARNING))
+            continue
+        row = [
+            name,
+            f'{result["rows"]:,}',
+            f'{result["best"] * 1000:.1f} ms',
+            f'{result["median"] * 1000:.1f} ms',
+            f'{result["rows_per_sec"]:,.0f}' if result['rows_per_sec'] else '',
+            fmt_datasize(result['peak_rss']) if result['peak_rss'] else '',
+        ]
+        if changes is not None:
+            change = changes.get(name, {})
+            row += [_fmt_change(change.get('best'), threshold), _fmt_change(change.get('peak_rss'), threshold)]
+        table.add_row(*row)
+    for module, elapsed in report['imports'].items():
+        row = [f'import {module}', '', f'{elapsed * 1000:.1f} ms', '', '', '']
+        if changes is not None:
+            row += [_fmt_change(changes.get(f'import {module}', {}).get('best'), threshold), '']
+        table.add_row(*row)
+    Console().print(table)
+
+
+@click.command('bench', short_help='运行内置的性能基准测试')
+@click.argument('names', nargs=-1, type=click.Choice(tuple(CASES.keys())))
+@click.option('-r', '--repeat', type=click.IntRange(min=1), default=5, show_default=True,
+              help='每项测试计时多少次。')
+@click.option('--warmup', type=click.IntRange(min=0), default=1, show_default=True,
+              help='计时之前先运行多少次。')
+@click.option('--seed', type=int, default=0, show_default=True, help='随机数种子，用于生成输入数据和 randbit 等命令。')
+@click.option('-o', '--output', type=click.Path(dir_okay=False, writable=True), help='把结果保存为 JSON 文件。')
+@click.option('-b', '--baseline', type=click.File(encoding='UTF-8'), help='与之前保存的 JSON 结果比较。')
+@click.option('-t', '--threshold', type=click.FloatRange(min=0), default=0.1, show_default=True,
+              help='耗时或内存峰值超出基线这个比例时视为退化，此时返回值为 1。')
+@click.option('-l', '--list', 'listing', is_flag=True, help='列出所有测试项及其命令行。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+@click.pass_context
+def run_benchmark(
+        ctx: click.Context,
+        names: tuple[str, ...],
+        repeat: int,
+        warmup: int,
+        seed: int,
+        output: str | None,
+        baseline,
+        threshold: float,
+        listing: bool,
+):
+    """
+    在进程内运行各个命令的核心功能，测量耗时、每秒行数、内存峰值和导入耗时。
+
+    NAMES 是要运行的测试项，默认运行全部。每项测试在独立的子进程中运行，输出重定向到临时文件。
+    """
+    if listing:
+        table = Table('测试项', '命令行', '依赖', box=box.SIMPLE_HEAD)
+        for case in CASES.values():
+            table.add_row(case.name, ' '.join(case.argv), case.requires or '')
+        Console().print(table)
+        return
+
+    report = run_benchmarks(names or tuple(CASES.keys()), repeat, warmup, seed)
+    changes = compare(report, json.load(baseline)) if baseline else None
+    print_report(report, changes, threshold)
+    if output:
+        with open(output, 'w', encoding='UTF-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if changes and (regressions := [
+        f'{name}.{metric}' for name, change in changes.items()
+        for metric, ratio in change.items() if ratio > threshold
+    ]):
+        click.secho(f'性能退化超过 {threshold:.0%}：{"、".join(regressions)}', err=True, fg=PT_ERROR)
+        ctx.exit(1)
@@ -1,14 +1,23 @@
-from base64 import b64encode, b85encode, b32encode
-from math import ceil
+import hashlib
+import mmap
+import os
+import sys
+import threading
+from base64 import b64encode, b85encode, b32encode, b64decode, b85decode, b32decode
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil, gcd
 from random import getrandbits, choices
-from typing import Any, Final
+from typing import Any, Final, BinaryIO, Iterable, Iterator, NoReturn
 
 import click
 from click.shell_completion import CompletionItem
 
 from core.click_chore import YudoConfigs
+from core.progress import Progress
+from core.schema import SchemaError
 from core.style import *
 
+CHUNK_SIZE: Final = 1 << 20
 # print(''.join(map(chr, range(32, 127))))
 CHARSETS = {
     'digit': '0123456789',
@@ -28,8 +37,8 @@ CHARSETS = {
 assert sorted(CHARSETS['symbol']) == sorted(CHARSETS['symbol_noshift'] + CHARSETS['symbol_shift'])
 
 with YudoConfigs(auto_patch=True) as configurations:
-    configurations.setdefaults('charset', **CHARSETS)
-    configurations.save()
+    if configurations.setdefaults('charset', **CHARSETS):
+        configurations.save()
 
 
 class Bytes(object):
@@ -71,18 +80,23 @@ class HexBytes(Bytes):
 
     def encode(self, data):
         # pure hex
-        if len(self.seperator) < 1:
+        if len(self.seperator) < 1 and not self.prefix and not self.suffix:
             return self.head + data.hex() + self.tail
 
-        # raw bytes
+        # raw bytes（bytes.hex 的 bytes_per_sep 为正数时从后往前数，与这里相反）
         if not self.prefix and not self.suffix:
-            result = data.hex(self.seperator, self.bytes_per_sep)
+            result = data.hex(self.seperator, -self.bytes_per_sep)
             return self.head + result + self.tail
 
         # decorated bytes
         def cut():
-            step = self.bytes_per_sep
-            for i in range(0, len(data), step):
+            step = abs(self.bytes_per_sep)
+            # 从后往前数时，第一组是不足 step 字节的余数
+            first = len(data) % step if self.bytes_per_sep < 0 else 0
+            starts = range(first, len(data), step)
+            if first:
+                yield self.prefix + data[:first].hex() + self.suffix
+            for i in starts:
                 section = data[i:i + step].hex()
                 yield self.prefix + section + self.suffix
 
@@ -112,6 +126,9 @@ class DecBytes(Bytes):
 
 class BaseBytes(object):
     BASE_LIST: Final = (64, 85, 32)
+    # 每组的原始字节数、编码后的字符数，按整组切分数据时分段编码的结果与整体编码完全相同
+    BLOCKS: Final = {64: (3, 4), 85: (4, 5), 32: (5, 8)}
+    WHITESPACE: Final = b' \t\r\n\v\f'
 
     def __init__(self, base: int):
         if base not in self.BASE_LIST:
@@ -133,6 +150,84 @@ class BaseBytes(object):
                 raise ValueError()
         return str(mid, encoding='ASCII')
 
+    def decode(self, data) -> bytes:
+        """
+        :raise ValueError: data 不是有效的编码。
+        """
+        match self._base:
+            case 64:
+                return b64decode(data, validate=True)
+            case 85:
+                return b85decode(data)
+            case 32:
+                return b32decode(data)
+            case _:
+                raise ValueError()
+
+    def unit(self, wrap: int = 0) -> int:
+        """
+        编码时每次至少要凑满多少字节：整组，换行时还要恰好是整行。按它的整数倍读取数据可以免去拼接。
+        """
+        raw, encoded = self.BLOCKS[self._base]
+        return raw * (wrap // gcd(wrap, encoded)) if wrap else raw
+
+    def encode_chunks(self, chunks: Iterable[bytes], wrap: int = 0) -> Iterator[bytes]:
+        """
+        流式编码。只编码凑满整组（换行时还要凑满整行）的部分，余下的留到下一块，所以内存占用与数据总量无关。
+
+        :param chunks: 任意大小的数据块，可以是同一块缓冲区的 memoryview，每块产出结果前都已用完。
+        :param wrap: 每行的字符数，0 表示不换行。
+        :return: 编码后的数据块，最后一块以换行结尾。
+        """
+        unit = self.unit(wrap)
+        pending, written = b'', False
+        for chunk in chunks:
+            data = pending + chunk if pending else chunk
+            cut = len(data) - len(data) % unit
+            if cut:
+                yield self._wrap(self._encode_bytes(data[:cut]), wrap)
+                written = True
+            pending = bytes(data[cut:])
+        if pending:
+            yield self._wrap(self._encode_bytes(pending), wrap)
+        if not wrap and (written or pending):
+            yield b'\n'
+
+    def decode_chunks(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        流式解码，忽略所有空白字符。
+
+        :raise ValueError: 数据不是有效的编码。
+        """
+        encoded = self.BLOCKS[self._base][1]
+        pending = b''
+        for chunk in chunks:
+            data = pending + bytes(chunk).translate(None, self.WHITESPACE)
+            cut = len(data) - len(data) % encoded
+            if cut:
+                yield self.decode(data[:cut])
+            pending = data[cut:]
+        if pending:
+            yield self.decode(pending)
+
+    def _encode_bytes(self, data) -> bytes:
+        match self._base:
+            case 64:
+                return b64encode(data)
+            case 85:
+                return b85encode(data)
+            case 32:
+                return b32encode(data)
+            case _:
+                raise ValueError()
+
+    @staticmethod
+    def _wrap(data: bytes, wrap: int) -> bytes:
+        # 换行时每一行都以换行符结尾；不换行时只在全部数据之后输出一个换行符
+        if not wrap:
+            return data
+        return b'\n'.join(data[i:i + wrap] for i in range(0, len(data), wrap)) + b'\n'
+
     # 真的需要直接替换对象方法以达到更快的速度吗？
 
     # def encode64(self, data) -> str:
@@ -175,6 +270,22 @@ class BitLength(click.ParamType):
             )
             self.fail(msg, param, ctx)
 
+    # hashlib 中对应的名称，MD2、SHA-0 没有实现；MD4 等是否可用取决于 OpenSSL
+    HASHLIB_NAMES: Final = {
+        'SM3': 'sm3', 'MD4': 'md4', 'MD5': 'md5',
+        'SHA-224': 'sha224', 'SHA3-224': 'sha3_224', 'SHA-512/224': 'sha512_224',
+        'SHA-256': 'sha256', 'SHA3-256': 'sha3_256', 'SHA-512/256': 'sha512_256',
+        'SHA-384': 'sha384', 'SHA3-384': 'sha3_384',
+        'SHA-512': 'sha512', 'SHA3-512': 'sha3_512', 'SHA-1': 'sha1',
+    }
+
+    @classmethod
+    def hashable(cls) -> dict[str, str]:
+        """
+        当前环境中 hashlib 能够计算的算法，key 是算法名称，value 是 hashlib 中的名称。
+        """
+        return {a: n for a, n in cls.HASHLIB_NAMES.items() if n in hashlib.algorithms_available}
+
     def shell_complete(self, ctx, param, incomplete: str) -> list[CompletionItem]:
         algorithms = self.ALGORITHMS.keys()
         algorithms = filter(lambda a: a.startswith(incomplete), algorithms) if incomplete else algorithms
@@ -183,21 +294,51 @@ class BitLength(click.ParamType):
         return [CompletionItem(a) for a in algorithms]
 
 
+def make_encoder(
+        decimal: bool, integer: bool, b64: bool, b85: bool, b32: bool,
+        group: int, seperator: str, prefix: str, suffix: str, head: str, tail: str,
+) -> Bytes | BaseBytes | None:
+    """
+    按 randbit、hash 共用的格式选项创建编码器。
+
+    :return: 以单个整数形式输出时为 None 。
+    """
+    if integer:
+        return None
+    if b64 or b85 or b32:
+        return BaseBytes(64 if b64 else 85 if b85 else 32)
+    if decimal:
+        return DecBytes(seperator, prefix, suffix, head, tail)
+    return HexBytes(seperator, prefix, suffix, head, tail, group)
+
+
+def encoding_options(f):
+    """
+    randbit、hash 共用的输出格式选项。
+    """
+    options = (
+        click.option('-x', '--hex', 'hexadecimal', is_flag=True, help='以十六进制数组（HEX）格式输出。'),
+        click.option('-d', '--dec', 'decimal', is_flag=True, help='以十进制数组格式输出。默认输出HEX。'),
+        click.option('-i', '--int', 'integer', is_flag=True, help='以单个整数形式输出。默认输出HEX。'),
+        click.option('--b64', '--base64', is_flag=True, help='base64编码后输出。默认输出HEX。'),
+        click.option('--b85', '--base85', is_flag=True, help='base85编码后输出。默认输出HEX。'),
+        click.option('--b32', '--base32', is_flag=True, help='base32编码后输出。默认输出HEX。'),
+        click.option('--group', default=1, type=int, help='多少字节一组（默认1）。'),
+        click.option('--seperator', default='', help='每组之间的间隔符。'),
+        click.option('--prefix', default='', help='每组字节的前缀。'),
+        click.option('--suffix', default='', help='每组字节的后缀。'),
+        click.option('--head', default='', help='开头的前缀。'),
+        click.option('--tail', default='', help='结尾的尾缀。'),
+    )
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+
 @click.command('randbit', no_args_is_help=True, short_help='随机生成一定数量比特的字节串（bytes）')
 @click.argument('bits', type=BitLength())
 @click.option('-q', '--qty', type=int, default=1, help='生成多少串字节串（每行一串）。')
-@click.option('-x', '--hex', 'hexadecimal', is_flag=True, help='以十六进制数组（HEX）格式输出。')
-@click.option('-d', '--dec', 'decimal', is_flag=True, help='以十进制数组格式输出。默认输出HEX。')
-@click.option('-i', '--int', 'integer', is_flag=True, help='以单个整数形式输出。默认输出HEX。')
-@click.option('--b64', '--base64', is_flag=True, help='base64编码后输出。默认输出HEX。')
-@click.option('--b85', '--base85', is_flag=True, help='base85编码后输出。默认输出HEX。')
-@click.option('--b32', '--base32', is_flag=True, help='base32编码后输出。默认输出HEX。')
-@click.option('--group', default=1, type=int, help='多少字节一组（默认1）。')
-@click.option('--seperator', default='', help='每组之间的间隔符。')
-@click.option('--prefix', default='', help='每组字节的前缀。')
-@click.option('--suffix', default='', help='每组字节的后缀。')
-@click.option('--head', default='', help='开头的前缀。')
-@click.option('--tail', default='', help='结尾的尾缀。')
+@encoding_options
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 def generate_bits(
         bits, qty, hexadecimal, decimal, integer, b64, b85, b32,
@@ -206,14 +347,7 @@ def generate_bits(
     """
     随机生成 BITS 比特的字节串，并以某种格式输出为文本。
     """
-    if integer:
-        op = None
-    elif b64 or b85 or b32:
-        op = BaseBytes(64 if b64 else 85 if b85 else 32)
-    elif decimal:
-        op = DecBytes(seperator, prefix, suffix, head, tail)
-    else:
-        op = HexBytes(seperator, prefix, suffix, head, tail, group)
+    op = make_encoder(decimal, integer, b64, b85, b32, group, seperator, prefix, suffix, head, tail)
 
     qb = ceil(bits / 8)  # quantity of bytes
     ds = (getrandbits(bits) for _ in range(qty))
@@ -239,13 +373,16 @@ def generate_chars(
 
     通常来说，如果要生成按比特数计的字符串，更建议用 randbit 命令。
     """
-    with YudoConfigs() as configs:
-        section = configs.ensure('charset')
-        for charset in charsets:
-            if charset not in section:
-                click.secho(f'字符集 {charset} 不存在。', err=True, fg=PT_WARNING)
-                return
+    section = YudoConfigs.typed().setdefault('charset')
+    for charset in charsets:
+        if charset not in section:
+            click.secho(f'字符集 {charset} 不存在。', err=True, fg=PT_WARNING)
+            return
+    try:
         chars = ''.join(section[name] for name in charsets)
+    except SchemaError as e:
+        click.secho(str(e), err=True, fg=PT_ERROR)
+        return
 
     if not chars:
         click.secho('未设置字符集。', err=True, fg=PT_WARNING)
@@ -257,3 +394,311 @@ def generate_chars(
             print(result[i:i + line_max])
     else:
         print(result)
+
+
+# 每个线程复用同一块读取缓冲区
+_buffers = threading.local()
+
+
+def digest_stream(stream: BinaryIO, names: tuple[str, ...]) -> tuple[list[bytes], int]:
+    """
+    读一遍 stream ，同时计算多个杂凑值。
+
+    每次用 readinto 读入同一块缓冲区，不为每块数据分配新的 bytes；hashlib 在数据较长时会释放 GIL，
+    所以多个线程可以真正并行地计算。
+
+    :param names: hashlib 中的算法名称。
+    :return: 各个杂凑值，以及读取的字节数。
+    """
+    try:
+        buffer = _buffers.buffer
+    except AttributeError:
+        buffer = _buffers.buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    hashers = [hashlib.new(name) for name in names]
+    size = 0
+    while n := stream.readinto(buffer):
+        chunk = view[:n]
+        for hasher in hashers:
+            hasher.update(chunk)
+        size += n
+    return [hasher.digest() for hasher in hashers], size
+
+
+def digest_file(path: str, names: tuple[str, ...]) -> tuple[list[bytes], int] | OSError:
+    """
+    计算文件的杂凑值。“-”表示标准输入。
+
+    :return: 同 digest_stream，无法读取时返回异常对象而不是抛出，以免打断其它文件。
+    """
+    try:
+        if path == '-':
+            return digest_stream(sys.stdin.buffer, names)
+        with open(path, 'rb', buffering=0) as f:
+            return digest_stream(f, names)
+    except OSError as e:
+        return e
+
+
+@click.command('hash', short_help='计算文件的杂凑值（摘要）')
+@click.argument('files', nargs=-1, type=click.Path(allow_dash=True))
+@click.option('-a', '--algorithm', 'algorithms', multiple=True,
+              type=click.Choice(tuple(BitLength.hashable())),
+              help='杂凑算法，可输入多个，读一遍文件即可全部算出。默认是 SHA-256。')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=min(8, os.cpu_count() or 1), show_default=True,
+              help='同时计算多少个文件。')
+@encoding_options
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+def hash_files(
+        files, algorithms, jobs, hexadecimal, decimal, integer, b64, b85, b32,
+        group, seperator, prefix, suffix, head, tail
+):
+    """
+    计算 FILES（不提供或者为“-”时读取标准输入）的杂凑值，格式选项与 randbit 相同。
+
+    只有一种算法时每行输出“杂凑值  文件名”，与 sha256sum 等命令相同；
+    有多种算法时每行输出“算法 (文件名) = 杂凑值”。
+    """
+    op = make_encoder(decimal, integer, b64, b85, b32, group, seperator, prefix, suffix, head, tail)
+    hashable = BitLength.hashable()
+    algorithms = tuple(dict.fromkeys(algorithms)) or ('SHA-256',)
+    names = tuple(hashable[a] for a in algorithms)
+    files = files or ('-',)
+
+    failed = False
+    with ThreadPoolExecutor(jobs) as executor, Progress('hash', total=len(files)) as progress:
+        # map 按提交的顺序返回，输出顺序与 FILES 一致
+        for path, result in zip(files, executor.map(digest_file, files, [names] * len(files))):
+            if isinstance(result, OSError):
+                click.secho(f'{path}: {result.strerror}', err=True, fg=PT_ERROR)
+                failed = True
+                continue
+            digests, size = result
+            for algorithm, digest in zip(algorithms, digests):
+                text = op.encode(digest) if op else str(int.from_bytes(digest, 'big'))
+                click.echo(f'{text}  {path}' if len(algorithms) == 1 else f'{algorithm} ({path}) = {text}')
+            progress.advance(1, size)
+    if failed:
+        sys.exit(1)
+
+
+def read_chunks(streams: Iterable[BinaryIO], size: int = CHUNK_SIZE) -> Iterator[memoryview]:
+    """
+    依次读取各个流，每次都读入同一块 size 字节的缓冲区，产出其中有效部分的 memoryview 。
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    for stream in streams:
+        while n := stream.readinto(buffer):
+            yield view[:n]
+
+
+@click.command('base', short_help='以 Base64、Base85、Base32 编码或解码文件')
+@click.argument('files', nargs=-1, type=click.File('rb'))
+@click.option('--b64', '--base64', 'base', flag_value=64, default=True, help='使用 Base64 （默认）。')
+@click.option('--b85', '--base85', 'base', flag_value=85, help='使用 Base85 。')
+@click.option('--b32', '--base32', 'base', flag_value=32, help='使用 Base32 。')
+@click.option('-D', '--decode', is_flag=True, help='解码。输入中的空白字符（包括换行）都会被忽略。')
+@click.option('-w', '--wrap', type=click.IntRange(min=0), default=76, show_default=True,
+              help='编码时每行最多多少个字符，0 表示不换行。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+def transcode_base(files, base, decode, wrap):
+    """
+    把 FILES（不提供时读取标准输入）连在一起，编码或解码后写到标准输出。
+
+    分块流式处理，内存占用固定；每块都按编码的整组（Base64 每3字节、Base85 每4字节、Base32 每5字节）切分，
+    结果与一次性编码整个文件完全相同。
+    """
+    codec = BaseBytes(base)
+    streams = files if files else (click.get_binary_stream('stdin'),)
+    unit = codec.BLOCKS[base][1] if decode else codec.unit(wrap)
+    chunks = read_chunks(streams, max(CHUNK_SIZE // unit, 1) * unit)
+    output = click.get_binary_stream('stdout')
+    try:
+        output.writelines(codec.decode_chunks(chunks) if decode else codec.encode_chunks(chunks, wrap))
+    except ValueError:
+        output.flush()
+        click.secho(f'输入不是有效的 Base{base} 编码。', err=True, fg=PT_ERROR)
+        sys.exit(1)
+    output.flush()
+
+
+# 可打印的ASCII字符原样保留，其它字节显示为“.”
+PRINTABLE: Final = bytes(b if 32 <= b < 127 else ord('.') for b in range(256))
+
+
+def read_range(path: str, offset: int, length: int | None, size: int) -> Iterator[bytes]:
+    """
+    按 size 字节一块读取文件的 [offset, offset + length) 这一段。
+
+    普通文件用 mmap 映射后直接切片，不会读取范围以外的部分；标准输入（“-”）、空文件等无法映射的，顺序读取并跳过前 offset 字节。
+    """
+    with open(path, 'rb') if path != '-' else click.get_binary_stream('stdin') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            mapped = None
+        if mapped is not None:
+            with mapped:
+                stop = len(mapped) if length is None else min(len(mapped), offset + length)
+                for i in range(offset, stop, size):
+                    yield mapped[i:min(i + size, stop)]
+            return
+
+        if f.seekable():
+            f.seek(offset)
+        else:
+            while offset > 0 and (skipped := f.read(min(offset, size))):
+                offset -= len(skipped)
+        remaining = length
+        while remaining is None or remaining > 0:
+            if not (block := f.read(size if remaining is None else min(size, remaining))):
+                break
+            # 管道可能一次读不满，凑满整块才能保证每块都按整行切分
+            while len(block) < size and (remaining is None or len(block) < remaining):
+                if not (more := f.read(size - len(block) if remaining is None else min(size, remaining) - len(block))):
+                    break
+                block += more
+            if remaining is not None:
+                remaining -= len(block)
+            yield block
+
+
+def hex_lines(
+        blocks: Iterable[bytes],
+        encoder: HexBytes,
+        columns: int,
+        gutter: bool,
+        offset: int,
+) -> Iterator[str]:
+    """
+    把按整行切分的数据块格式化为一行行的文本。
+
+    整块数据只调用一次编码器（不带 head、tail），再按固定的宽度切成行，因为每行都是整组，行与行之间恰好隔着一个间隔符。
+    只有最后不满一行的部分单独编码。
+    """
+    inner = HexBytes(encoder.seperator, encoder.prefix, encoder.suffix, '', '', encoder.bytes_per_sep)
+    width = len(inner.encode(bytes(columns)))
+    stride = width + len(encoder.seperator)
+    head, tail = encoder.head, encoder.tail
+    gutter_line = f'{{:08x}}: {{:<{width + len(head) + len(tail)}}}  {{}}'.format
+    for block in blocks:
+        full = len(block) - len(block) % columns
+        text = inner.encode(block[:full])
+        lines = [head + text[i:i + width] + tail for i in range(0, len(text), stride)]
+        if full < len(block):
+            lines.append(head + inner.encode(block[full:]) + tail)
+        if gutter:
+            ascii_text = block.translate(PRINTABLE).decode('ascii')
+            texts = [ascii_text[i:i + columns] for i in range(0, len(ascii_text), columns)]
+            yield from map(gutter_line, range(offset, offset + len(block), columns), lines, texts)
+        else:
+            yield from lines
+        offset += len(block)
+
+
+def unhex_line(line: str, encoder: HexBytes, width: int | None) -> bytes:
+    """
+    还原一行 hex_lines 的输出。
+
+    :param width: 带偏移量和ASCII字符栏时，十六进制部分（含 head、tail）的宽度；否则为 None 。
+    :raise ValueError: 格式有误。
+    """
+    line = line.rstrip('\r\n')
+    if width is not None:
+        line = line.partition(': ')[2][:width].rstrip()
+    line = line.removeprefix(encoder.head).removesuffix(encoder.tail)
+    delimiter = encoder.seperator or encoder.prefix or encoder.suffix
+    groups = line.split(delimiter) if delimiter else (line,)
+    return bytes.fromhex(''.join(g.removeprefix(encoder.prefix).removesuffix(encoder.suffix) for g in groups))
+
+
+def exit_on_broken_pipe() -> NoReturn:
+    """
+    标准输出的读取方已经关闭（比如接在 head 后面）时，不报错，直接退出。
+    """
+    # 把标准输出指向 /dev/null，免得解释器退出时刷新缓冲区再次引发 BrokenPipeError
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    sys.exit(1)
+
+
+@click.command('hex', no_args_is_help=True, short_help='以十六进制格式输出文件，或者还原为二进制')
+@click.argument('file', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('-s', '--offset', type=click.IntRange(min=0), default=0, help='从第几个字节开始（从0开始）。')
+@click.option('-n', '--length', type=click.IntRange(min=0), help='最多输出多少个字节。默认直到文件末尾。')
+@click.option('-c', '--columns', type=click.IntRange(min=0), default=16, show_default=True,
+              help='每行多少字节，必须是 --group 的整数倍。0 表示全部放在一行。')
+@click.option('-g', '--gutter', is_flag=True,
+              help='在每行前面加上偏移量、后面加上ASCII字符，类似 xxd 。此时默认两字节一组、以空格间隔。')
+@click.option('-P', '--pythonic', is_flag=True, help='每行输出一个 Python 的 bytes 字面量，比如 b"\\xd7\\xd3"。')
+@click.option('-r', '--reverse', is_flag=True,
+              help='把十六进制文本逐行还原为二进制，其余格式选项必须与生成时相同。')
+@click.option('--group', type=click.IntRange(min=1), help='多少字节一组（默认1）。')
+@click.option('--seperator', help='每组之间的间隔符。')
+@click.option('--prefix', default='', help='每组字节的前缀。')
+@click.option('--suffix', default='', help='每组字节的后缀。')
+@click.option('--head', default='', help='每行开头的前缀。')
+@click.option('--tail', default='', help='每行结尾的尾缀。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+def dump_hex(
+        file, offset, length, columns, gutter, pythonic, reverse,
+        group, seperator, prefix, suffix, head, tail,
+):
+    """
+    以十六进制格式输出 FILE（“-”表示标准输入）的全部或一部分，格式选项与 randbit 相同，
+    比如 --prefix 0x --seperator ", " --tail , 可以得到C语言的数组。
+
+    普通文件通过 mmap 读取，--offset、--length 之外的部分不会被读取。
+    """
+    if pythonic:
+        encoder = PythonicBytes()
+    else:
+        group = group or (2 if gutter else 1)
+        seperator = (' ' if gutter else '') if seperator is None else seperator
+        encoder = HexBytes(seperator, prefix, suffix, head, tail, group)
+    if columns % encoder.bytes_per_sep:
+        click.secho('每行的字节数必须是每组字节数的整数倍。', err=True, fg=PT_WARNING)
+        return
+    if gutter and not columns:
+        click.secho('带偏移量和ASCII字符栏时，每行的字节数不能为0。', err=True, fg=PT_WARNING)
+        return
+
+    if reverse:
+        width = len(encoder.encode(bytes(columns))) if gutter else None
+        lines = click.open_file(file, encoding='ASCII', errors='replace')
+        output = click.get_binary_stream('stdout')
+        try:
+            with lines:
+                for number, line in enumerate(lines, start=1):
+                    try:
+                        output.write(unhex_line(line, encoder, width))
+                    except ValueError:
+                        output.flush()
+                        click.secho(f'第 {number} 行不是有效的十六进制文本。', err=True, fg=PT_ERROR)
+                        sys.exit(1)
+            output.flush()
+        except BrokenPipeError:
+            exit_on_broken_pipe()
+        return
+
+    try:
+        if columns:
+            size = max(CHUNK_SIZE // columns, 1) * columns
+            blocks = read_range(file, offset, length, size)
+            with Progress('hex') as progress:
+                progress.write(hex_lines(blocks, encoder, columns, gutter, offset))
+            return
+
+        # 全部放在一行：逐块编码、写出，不必把整行放在内存里
+        size = CHUNK_SIZE - CHUNK_SIZE % encoder.bytes_per_sep
+        inner = HexBytes(encoder.seperator, encoder.prefix, encoder.suffix, '', '', encoder.bytes_per_sep)
+        output = click.get_text_stream('stdout')
+        output.write(encoder.head)
+        for i, block in enumerate(read_range(file, offset, length, size)):
+            output.write((encoder.seperator if i else '') + inner.encode(block))
+        output.write(encoder.tail + '\n')
+    except BrokenPipeError:
+        exit_on_broken_pipe()
+    except OSError as e:
+        click.secho(f'{file}: {e.strerror}', err=True, fg=PT_ERROR)
+        sys.exit(1)
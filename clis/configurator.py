@@ -1,13 +1,24 @@
+import os
 import re
+from configparser import ConfigParser, NoSectionError, NoOptionError, Error as ConfigError
+from io import TextIOWrapper
+from json import load as json_load, dump as json_dump
 from pathlib import Path
-from typing import Literal
+from tempfile import NamedTemporaryFile
+from typing import Literal, NamedTuple, Iterator
 
 import click
+from click.shell_completion import CompletionItem
 from rich import box
 from rich.console import Console
 from rich.table import Table
 
-from core.click_chore import YudoConfigs, ask, cmd, warning, AutoReadConfigPaser, curd
+from core.alias import PLACEHOLDER
+from core.click_chore import (
+    YudoConfigs, ask, cmd, warning, AutoReadConfigPaser, curd, read_template_params, user_cache_path,
+)
+from core.schema import SchemaError
+from core.style import *
 
 
 def get_frp_install_path() -> Path:
@@ -18,13 +29,102 @@ def get_frp_install_path() -> Path:
     :raise TypeError: 配置的是一个文件而非文件夹。
     :raise FileNotFoundError: 安装目录已设置，但不存在。
     """
-    with YudoConfigs() as configs:
-        path = Path(configs['frp']['path'])
-        if not path.exists():
-            raise FileNotFoundError
-        if not path.is_dir():
-            raise TypeError
-        return path
+    try:
+        return YudoConfigs.typed().get_option('frp', 'path')
+    except (NoSectionError, NoOptionError):
+        raise KeyError('frp.path')
+    except SchemaError as e:
+        if isinstance(e.reason, NotADirectoryError):
+            raise TypeError(e.reason.args[0]) from e
+        raise FileNotFoundError(e.reason.args[0]) from e
+
+
+FRP_INDEX_PATH = user_cache_path('frp_index.json')
+FRP_CONFIG_NAME = re.compile(r'(frpc|frps)_?(.*)\.ini')
+FRP_SECTION_HEAD = re.compile(rb'^[ \t]*\[[^]\r\n]+][ \t]*$', re.MULTILINE)
+
+
+class FrpConfig(NamedTuple):
+    name: str
+    filename: str
+    mtime: int
+    size: int
+    sections: int
+
+
+_frp_index: dict | None = None
+
+
+def _frp_config_unchanged(path: Path, config: FrpConfig) -> bool:
+    try:
+        st = (path / config.filename).stat()
+    except OSError:
+        return False
+    return (st.st_mtime_ns, st.st_size) == (config.mtime, config.size)
+
+
+def index_frp_configs(
+        path: Path,
+        refresh: bool = False,
+        verify: bool = False,
+) -> dict[str, dict[str, FrpConfig]]:
+    """
+    读取 frp 安装目录的配置索引。
+
+    索引保存在用户缓存目录的 frp_index.json 中。增删、重命名文件会改变安装目录的修改时间，
+    所以查找和补全只要目录的修改时间没变就直接使用索引，不必逐个访问文件；
+    需要准确的节数时用 verify 额外核对每个文件的修改时间和大小。
+    失效时重新扫描目录，并且只重新统计修改过的文件的节数。
+
+    :param path: frp 的安装目录。
+    :param refresh: 忽略已有索引，强制重新扫描。
+    :param verify: 核对每个已索引文件的修改时间和大小，原地修改过的文件会被重新统计。
+    :return: 以 frpc、frps 为键，{简短名称: FrpConfig} 为值的字典。
+    """
+    global _frp_index
+    mtime = path.stat().st_mtime_ns
+    index = _frp_index
+    if index is None:
+        try:
+            with open(FRP_INDEX_PATH, 'r', encoding='UTF-8') as f:
+                index = json_load(f)
+            index['scopes'] = {
+                scope: {name: FrpConfig(*config) for name, config in configs.items()}
+                for scope, configs in index['scopes'].items()
+            }
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            index = {}
+    if not refresh and index.get('path') == str(path) and index.get('mtime') == mtime and (not verify or all(
+            _frp_config_unchanged(path, config)
+            for configs in index['scopes'].values() for config in configs.values()
+    )):
+        _frp_index = index
+        return index['scopes']
+
+    previous = index.get('scopes', {}) if index.get('path') == str(path) else {}
+    scopes = {'frpc': {}, 'frps': {}}
+    for entry in os.scandir(path):
+        if not (result := FRP_CONFIG_NAME.fullmatch(entry.name)) or not entry.is_file():
+            continue
+        scope, name = result.groups()
+        st = entry.stat()
+        known = previous.get(scope, {}).get(name)
+        current = (entry.name, st.st_mtime_ns, st.st_size)
+        if not refresh and known and (known.filename, known.mtime, known.size) == current:
+            scopes[scope][name] = known
+            continue
+        with open(entry.path, 'rb') as f:
+            sections = len(FRP_SECTION_HEAD.findall(f.read()))
+        scopes[scope][name] = FrpConfig(name, entry.name, st.st_mtime_ns, st.st_size, sections)
+
+    _frp_index = {'path': str(path), 'mtime': mtime, 'scopes': scopes}
+    try:
+        FRP_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(FRP_INDEX_PATH, 'w', encoding='UTF-8') as f:
+            json_dump(_frp_index, f, ensure_ascii=False)
+    except OSError:
+        pass  # 索引只是缓存，写不进去也不影响使用
+    return scopes
 
 
 def find_frp_configs(
@@ -39,9 +139,8 @@ def find_frp_configs(
     :return: 以配置文件短名称为键，元组为值的字典。元组包含配置文件的路径、名称和后缀。
     """
     return {
-        result.group(1): (fo.parent, fo.name, fo.suffix)
-        for fo in path.iterdir()
-        if (result := re.fullmatch(scope + r'_?(.*)\.ini', fo.name))
+        name: (path, config.filename, '.ini')
+        for name, config in index_frp_configs(path)[scope].items()
     }
 
 
@@ -60,6 +159,8 @@ def find_frp_config(
     :raise FileNotFoundError: 文件不存在。args[0] 是一个Path对象，表示文件地址。
     :raise TypeError: 目标不是一个文件。args[0] 是一个Path对象，表示文件地址。
     """
+    if config := index_frp_configs(path)[scope].get(name or ''):
+        return path / config.filename
     cfp = path / (f'{scope}_{name}.ini' if name else f'{scope}.ini')
     if not cfp.exists():
         raise FileNotFoundError(cfp)
@@ -68,7 +169,22 @@ def find_frp_config(
     return cfp
 
 
-def configurate_frp(instruction, pattern: str, filename: str, list_all: bool, delete_it: bool):
+def complete_frp_config(ctx: click.Context, param: click.Parameter, incomplete: str) -> list[CompletionItem]:
+    """
+    补全 -c NAME 的简短名称。命令名称是 frpc 或 frps 时只补全对应的配置。
+    """
+    try:
+        path = get_frp_install_path()
+    except (KeyError, FileNotFoundError, TypeError):
+        return []
+    scopes = index_frp_configs(path)
+    names = scopes.get(ctx.command.name[:4]) or {**scopes['frps'], **scopes['frpc']}
+    return [CompletionItem(name) for name in sorted(names) if name and name.startswith(incomplete)]
+
+
+def configurate_frp(
+        instruction, pattern: str, filename: str, list_all: bool, delete_it: bool, refresh: bool = False,
+):
     try:
         path = get_frp_install_path()
     except (KeyError, FileNotFoundError):
@@ -85,13 +201,13 @@ def configurate_frp(instruction, pattern: str, filename: str, list_all: bool, de
         return
 
     if list_all:
-        table = Table('简短名称', '查看方式', '文件名', box=box.SIMPLE_HEAD)
-        for name, info in find_frp_configs(path, instruction.name).items():
+        table = Table('简短名称', '查看方式', '文件名', '节数', box=box.SIMPLE_HEAD)
+        for name, config in sorted(index_frp_configs(path, refresh, verify=True)[instruction.name].items()):
             if name == '':
                 command = cmd(configurate, instruction)
             else:
                 command = cmd(configurate, instruction, '-c', name)
-            table.add_row(name, command, info[1])
+            table.add_row(name, command, config.filename, str(config.sections))
         else:
             console = Console()
             console.print(table)
@@ -112,6 +228,70 @@ def configurate_frp(instruction, pattern: str, filename: str, list_all: bool, de
         curd(parser, pattern, delete_it)
 
 
+def frp_port_key(section: dict[str, str]) -> tuple[str, str] | None:
+    """
+    代理在服务端占用的端口。tcp、udp 等不同协议可以使用相同的端口号。
+    """
+    if port := section.get('remote_port'):
+        return section.get('type', 'tcp'), port
+    return None
+
+
+def fill_placeholders(text: str, row: dict[str, str]) -> str:
+    """
+    只替换 @(KEY) 形式的占位符。
+
+    :raise KeyError: 缺少某个占位符的值。
+    """
+    return PLACEHOLDER.sub(lambda m: row[m.group(1)], text)
+
+
+def expand_frp_template(
+        template: dict[str, str],
+        rows: Iterator[dict[str, str]],
+        section_name: str,
+        existing: dict[str, dict[str, str]],
+) -> Iterator[tuple[int, str, dict[str, str] | None, str | None]]:
+    """
+    用每一行参数渲染模板节，并检查节名称和端口是否冲突。
+
+    冲突检查基于内存中的索引：已有的节和已生成的节都只登记一次，每行只需查一次字典。
+
+    :param template: 模板节。配置值中的 @(KEY) 会被替换为参数中 KEY 列的值，其余文本（比如 Go 模板的 {{ }}）原样保留。
+    :param rows: 模板参数。
+    :param section_name: 生成的节名称的格式。
+    :param existing: 配置文件中已有的节。
+    :return: 逐行产出 (行号, 节名称, 节, 错误信息)。有错误时节为 None。
+    """
+    sections = set(existing.keys())
+    ports = {
+        key: title for title, section in existing.items()
+        if (key := frp_port_key(section))
+    }
+    for lineno, row in enumerate(rows, start=1):
+        try:
+            title = fill_placeholders(section_name, row)
+            section = {k: fill_placeholders(v, row) for k, v in template.items()}
+        except KeyError as e:
+            yield lineno, '', None, f'缺少参数 {e.args[0]}。'
+            continue
+        if title in sections:
+            yield lineno, title, None, f'节 {title} 已存在。'
+            continue
+        for option in ('local_port', 'remote_port'):
+            if option in section and not (section[option].isdigit() and 0 < int(section[option]) < 65536):
+                yield lineno, title, None, f'{option} 不是有效的端口号：{section[option]}'
+                break
+        else:
+            if (key := frp_port_key(section)) and key in ports:
+                yield lineno, title, None, f'{key[0]} 端口 {key[1]} 已被 {ports[key]} 占用。'
+                continue
+            sections.add(title)
+            if key:
+                ports[key] = title
+            yield lineno, title, section, None
+
+
 @click.group('conf', short_help='读取或写入配置文件')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 def configurate():
@@ -125,24 +305,132 @@ def configurate():
 @click.option('-d', '--delete', 'delete_it', is_flag=True, help='删除某个配置项或整个配置节。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 def configurate_yudo(pattern: str, delete_it: bool):
-    curd(YudoConfigs(), pattern, delete_it)
+    try:
+        curd(YudoConfigs(), pattern, delete_it)
+    except SchemaError as e:
+        click.secho(str(e), err=True, fg=PT_ERROR)
 
 
 @configurate.command('frpc', short_help='配置 frp 客户端')
 @click.argument('pattern', metavar='[SECTION[.KEY[=VALUE]]]', default='', required=False)
 @click.option('-l', '--list', 'list_all', is_flag=True, help='列举所有配置文件及相应的短名称。')
-@click.option('-c', '--config', 'filename', default='', help='配置哪个文件。提供简短名称。')
+@click.option('-c', '--config', 'filename', default='', shell_complete=complete_frp_config,
+              help='配置哪个文件。提供简短名称。')
 @click.option('-d', '--delete', 'delete_it', is_flag=True, help='删除一个配置项或整个配置节。')
+@click.option('--refresh', is_flag=True, help='重新扫描安装目录，更新配置文件索引。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def configurate_frpc(pattern: str, filename: str, list_all: bool, delete_it: bool):
-    configurate_frp(configurate_frpc, pattern, filename, list_all, delete_it)
+def configurate_frpc(pattern: str, filename: str, list_all: bool, delete_it: bool, refresh: bool):
+    configurate_frp(configurate_frpc, pattern, filename, list_all, delete_it, refresh)
 
 
 @configurate.command('frps', short_help='配置 frp 服务端')
 @click.argument('pattern', metavar='[SECTION[.KEY[=VALUE]]]', default='', required=False)
 @click.option('-l', '--list', 'list_all', is_flag=True, help='列举所有配置文件及相应的短名称。')
-@click.option('-c', '--config', 'filename', default='', help='配置哪个文件。提供简短名称。')
+@click.option('-c', '--config', 'filename', default='', shell_complete=complete_frp_config,
+              help='配置哪个文件。提供简短名称。')
 @click.option('-d', '--delete', 'delete_it', is_flag=True, help='删除一个配置项或整个配置节。')
+@click.option('--refresh', is_flag=True, help='重新扫描安装目录，更新配置文件索引。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+def configurate_frps(pattern: str, filename: str, list_all: bool, delete_it: bool, refresh: bool):
+    configurate_frp(configurate_frps, pattern, filename, list_all, delete_it, refresh)
+
+
+@configurate.command('frpcgen', no_args_is_help=True, short_help='用模板批量生成 frp 客户端的代理配置')
+@click.argument('template', metavar='SECTION')
+@click.argument('params', type=click.File(encoding='UTF-8'))
+@click.option('-c', '--config', 'filename', default='', shell_complete=complete_frp_config,
+              help='写入哪个文件。提供简短名称。')
+@click.option('-T', '--template-file', type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help='从这个文件读取模板节。默认从写入的文件读取，并在写入时移除模板节。')
+@click.option('-n', '--name', 'section_name', default='@(name)', show_default=True,
+              help='生成的节名称的格式。')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='参数文件的格式。默认按后缀判断，无法判断时视为 CSV。')
+@click.option('--dry-run', is_flag=True, help='只输出生成的配置，不写入文件。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def configurate_frps(pattern: str, filename: str, list_all: bool, delete_it: bool):
-    configurate_frp(configurate_frps, pattern, filename, list_all, delete_it)
+def configurate_frpc_template(
+        template: str,
+        params: TextIOWrapper,
+        filename: str,
+        template_file: Path | None,
+        section_name: str,
+        fmt: str | None,
+        dry_run: bool,
+):
+    """
+    用 PARAMS 中的每一行参数渲染模板节 SECTION，批量生成 frp 客户端的代理配置。
+
+    模板的配置值使用 @(KEY) 引用参数，PARAMS 可以是 CSV 或 JSONL 文件，- 表示标准输入。
+    """
+    try:
+        path = get_frp_install_path()
+    except (KeyError, FileNotFoundError, TypeError):
+        warning(
+            '请先使用以下命令设置 frp 的安装目录：',
+            cmd(configurate, 'yudo', 'frp.path=YOUR_INSTALL_PATH'),
+        )
+        return
+    try:
+        cfp = find_frp_config(path, 'frpc', filename)
+    except (TypeError, FileNotFoundError) as e:
+        warning(f'找不到配置文件：{e.args[0]!s}')
+        return
+
+    parser = ConfigParser(interpolation=None)
+    try:
+        parser.read(cfp, encoding='UTF-8')
+        source = parser
+        if template_file:
+            source = ConfigParser(interpolation=None)
+            source.read(template_file, encoding='UTF-8')
+    except ConfigError as e:
+        click.secho(f'配置文件格式有误：{e}', err=True, fg=PT_ERROR)
+        return
+    if not source.has_section(template):
+        warning(f'找不到模板节 {template} 。')
+        return
+    template_section = dict(source.items(template, raw=True))
+    if not template_file:
+        parser.remove_section(template)
+
+    existing = {title: dict(parser.items(title, raw=True)) for title in parser.sections() if title != 'common'}
+    fmt = fmt or ('jsonl' if params.name.endswith(('.jsonl', '.json')) else 'csv')
+    rows = read_template_params(params, fmt)
+
+    out = NamedTemporaryFile('w', encoding='UTF-8', dir=cfp.parent, delete=False) if not dry_run else None
+    qty = errors = 0
+    try:
+        if out:
+            parser.write(out)
+        try:
+            for lineno, title, section, error in expand_frp_template(template_section, rows, section_name, existing):
+                if error:
+                    errors += 1
+                    warning(f'第 {lineno} 行：{error}')
+                    continue
+                qty += 1
+                text = f'[{title}]\n' + ''.join(f'{k} = {v}\n' for k, v in section.items()) + '\n'
+                if out:
+                    out.write(text)
+                else:
+                    click.echo(text, nl=False)
+        except ValueError as e:
+            errors += 1
+            warning(f'参数文件有误：{e}')
+        if out:
+            out.close()
+            if errors:
+                os.unlink(out.name)
+            else:
+                os.chmod(out.name, cfp.stat().st_mode)
+                os.replace(out.name, cfp)
+    except BaseException:
+        if out:
+            out.close()
+            os.unlink(out.name)
+        raise
+
+    if errors:
+        click.secho(f'有 {errors} 行参数无效，未写入任何配置。', err=True, fg=PT_ERROR)
+    elif not dry_run:
+        click.secho(f'已生成 {qty} 个代理节并写入 {cfp.name}。', err=True, fg=PT_SPECIAL)
@@ -1,17 +1,102 @@
 import re
 from datetime import datetime, date, timedelta, timezone
 from types import UnionType
-from typing import Pattern
+from typing import Pattern, Callable, Iterable, Iterator
 
 import click
 
-from core.click_chore import Regex, ask
+from core import calendars, sampling
+from core.click_chore import Regex, IntSet, ask, fmt_datasize, YudoConfigs
+from core.progress import Progress
 from core.structs import Segment, SegmentSet
 from core.style import *
 
 ZODIACS = '鼠牛虎兔龙蛇马羊猴鸡狗猪'
 DATE_FORMAT = '%Y.%m.%d'
 DATETIME_FORMAT = f'{DATE_FORMAT}+%H:%M:%S'
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+STEP_UNITS = {
+    'ms': timedelta(milliseconds=1),
+    's': timedelta(seconds=1),
+    'min': timedelta(minutes=1),
+    'h': timedelta(hours=1),
+    'd': timedelta(days=1),
+    'w': timedelta(weeks=1),
+}
+EPOCH_RESOLUTIONS = {'s': 1_000_000, 'ms': 1_000}
+
+
+class BusinessDays(int):
+    """以工作日计的偏移量。"""
+
+
+def work_calendar() -> calendars.WorkCalendar | None:
+    """
+    读取与 yudo.ini 同一目录下的工作日历。
+
+    :return: 文件有误时提示错误并返回 None。
+    """
+    try:
+        return calendars.WorkCalendar.load(YudoConfigs.PATH.parent)
+    except ValueError as e:
+        click.secho(str(e), err=True, fg=PT_ERROR)
+        return None
+
+
+class Step(click.ParamType):
+    name = 'step'
+
+    def __init__(self, minimum: timedelta = MICROSECOND):
+        self._minimum = minimum
+
+    def convert(self, value: str | timedelta, param, ctx) -> timedelta:
+        if isinstance(value, timedelta):
+            return value
+        match = re.fullmatch(r'(\d*)(ms|s|min|h|d|w)', value)
+        if not match or int(match[1] or 1) < 1:
+            self.fail(f'步长的格式为“[N]单位”，单位是 {"、".join(STEP_UNITS)} 之一。', param, ctx)
+        step = int(match[1] or 1) * STEP_UNITS[match[2]]
+        if step % self._minimum:
+            self.fail(f'步长必须是 {self._minimum} 的整数倍。', param, ctx)
+        return step
+
+
+class WallClockFormatter(object):
+    DATE_DIRECTIVES = frozenset('aAbBdjmuUwWyYGV%')
+    TIME_FIELDS = {'H': '{0:02d}', 'M': '{1:02d}', 'S': '{2:02d}', 'f': '{3:06d}'}
+
+    def __init__(self, fmt: str):
+        """
+        把墙上时间（距 1970-01-01 00:00 的微秒数）按 strftime 格式转换为文本。
+
+        日期部分每天只交给 strftime 渲染一次，时、分、秒、微秒直接由整数格式化。
+
+        :raise ValueError: 格式中有需要时区或区域设置的指令（比如 %z、%p、%c）。
+        """
+        directives = set(re.findall(r'%(.)', fmt))
+        if not directives <= self.DATE_DIRECTIVES | self.TIME_FIELDS.keys():
+            raise ValueError(fmt)
+        # 时分秒指令先换成私用区字符，免得被 strftime 渲染
+        self._fmt = re.sub(r'%(.)', lambda m: f'\ue001{m[1]}' if m[1] in self.TIME_FIELDS else m[0], fmt)
+
+    def _render_day(self, day: int) -> Callable[..., str]:
+        text = (EPOCH + timedelta(days=day)).strftime(self._fmt)
+        text = text.replace('{', '{{').replace('}', '}}')
+        for directive, field in self.TIME_FIELDS.items():
+            text = text.replace(f'\ue001{directive}', field)
+        return text.format
+
+    def __call__(self, moments: Iterable[int]) -> Iterator[str]:
+        last, render = None, None
+        for moment in moments:
+            day, moment = divmod(moment, 86_400_000_000)
+            if day != last:
+                last, render = day, self._render_day(day)
+            second, micro = divmod(moment, 1_000_000)
+            hour, second = divmod(second, 3600)
+            minute, second = divmod(second, 60)
+            yield render(hour, minute, second, micro)
 
 
 class RawRange(click.ParamType):
@@ -56,6 +141,8 @@ class RawRange(click.ParamType):
         if self._type == timedelta | date:  # 基于BASE这一天的偏移量
             negative = value.startswith('-')
             value = value[1:] if negative else value
+            if match := re.fullmatch(r'(\d+)b', value):  # 工作日需要知道BASE才能换算
+                return BusinessDays(-int(match[1]) if negative else int(match[1]))
             deltas = re.findall(r'(\d+)([ymdsw])', value)
             if not (_v := ''.join(''.join(d) for d in deltas)) == value:
                 raise ValueError(f'{value} 解析得到 {_v}')
@@ -76,7 +163,7 @@ class RawRange(click.ParamType):
                 int(qty) * {'h': 3600 * 1000, 'm': 60 * 1000, 's': 1 * 1000, 'f': 1}[unit]
                 for qty, unit in deltas
             )
-            delta = timedelta(days=summary // 1000, milliseconds=summary % 1000)
+            delta = timedelta(seconds=summary // 1000, milliseconds=summary % 1000)
             return -delta if negative else delta
         raise TypeError()
 
@@ -88,8 +175,15 @@ class RawRange(click.ParamType):
             return int(value) if value else date.today().year
         if self._type is date:  # 直接指定日期区间的话不会有尾缀
             return None
-        if self._type is timedelta:  # 偏移量区间有个BASE，用以表明偏移量是基于哪一天
+        if self._type == timedelta | date:  # 偏移量区间有个BASE，用以表明偏移量是基于哪一天
             return datetime.strptime(value, DATE_FORMAT).date() if value else date.today()
+        if self._type == timedelta | datetime:  # 偏移量区间有个BASE，用以表明偏移量是基于哪一刻
+            if not value:
+                return datetime.now()
+            try:
+                return datetime.strptime(value, DATETIME_FORMAT)
+            except ValueError:
+                return datetime.strptime(value, DATE_FORMAT)
         if self._type is float:  # 时间戳区间尾缀一个时区
             return datetime.strptime(value, '%z').tzinfo
         if self._type is datetime:  # 直接指定时间区间的话不会有尾缀
@@ -110,9 +204,25 @@ class RawRange(click.ParamType):
               metavar='LEFT[~RIGHT][,BASE]', type=RawRange(timedelta | date), multiple=True,
               help='每个 -o 输出范围内的所有日期，范围的左右两边由基于 BASE 的偏移量决定。\n'
                    'BASE 默认是当天。偏移量正则表达为“-?(\\d+[ymdsw]){1,}”，\n'
-                   '其中后缀“d”表示一天，1m(月)=30d，1y(年)=365d，1w(星期)=7d，1s(季度)=3m=90d。')
+                   '其中后缀“d”表示一天，1m(月)=30d，1y(年)=365d，1w(星期)=7d，1s(季度)=3m=90d。\n'
+                   '偏移量也可以是“-?\\d+b”，表示多少个工作日，工作日按 holidays.ini、holidays.csv 计算。')
+@click.option('-x', '--exclude', 'excludes',
+              metavar='MIN[~MAX]', type=RawRange(date), multiple=True,
+              help='每个 -x 排除一个日期，或范围内的所有日期。')
+@click.option('-s', '--step', type=Step(STEP_UNITS['d']), help='递增量，比如 2d、1w。默认是 1d。')
 @click.option('-z', '--zodiacs', help='过滤不在这些生肖年的日期，例如“虎兔龙蛇”。生肖年按公历算。')
+@click.option('-w', '--weekdays', type=IntSet(1, 7), metavar='1,3,5-7',
+              help='只保留星期几（1~7 分别是星期一到星期日）。')
+@click.option('-M', '--months', type=IntSet(1, 12), metavar='1,3,5-7', help='只保留这些月份。')
+@click.option('-d', '--days', 'month_days', type=IntSet(1, 31), metavar='1,3,5-7', help='只保留每月的这些天。')
+@click.option('--leap-day/--no-leap-day', default=None, help='只保留闰日（2月29日）/排除闰日。')
+@click.option('--workdays', 'workday', flag_value=True, default=None,
+              help='只保留工作日。节假日和调休在 yudo.ini 所在目录的 holidays.ini 或 holidays.csv 中定义。')
+@click.option('--holidays', 'workday', flag_value=False, help='只保留休息日（周末和节假日）。')
 @click.option('-r', '--regex', type=Regex(), help='过滤不能完全匹配正则表达式的(格式化后的)日期。')
+@click.option('--sample', type=click.IntRange(min=1), metavar='N',
+              help='不穷举，而是从所有日期中不重复地随机抽取 N 个，保持原有顺序。不能与 -r 同时使用。')
+@click.option('--seed', type=int, help='--sample 的随机数种子，相同的种子得到相同的结果。')
 @click.option('-F', '--force', is_flag=True, help='不提示数量，直接穷举输出所有日期。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 def enum_date(
@@ -120,38 +230,92 @@ def enum_date(
         days: tuple[tuple[date, date, None]],
         ages: tuple[tuple[int, int, int]],
         offsets: tuple[tuple[timedelta, timedelta, date]],
+        excludes: tuple[tuple[date, date, None]],
+        step: timedelta | None,
         regex: Pattern,
         zodiacs: str,
+        weekdays: frozenset[int] | None,
+        months: frozenset[int] | None,
+        month_days: frozenset[int] | None,
+        leap_day: bool | None,
+        workday: bool | None,
+        sample: int | None,
+        seed: int | None,
         force: bool,
 ):
     """
-    穷举范围内的日期（不含时间），并以自定义格式输出。递增量为1天。
+    穷举范围内的日期（不含时间），并以自定义格式输出。递增量默认为1天。
+
+    生肖、星期、月份、日期、闰日这些条件在穷举之前就与日期区间求交集，数量提示是精确的。
     """
     try:
         date(1949, 10, 1).strftime(fmt)
     except ValueError:
         click.secho('输出格式有误。', err=True, fg=PT_WARNING)
         return
+    if sample and regex:
+        click.secho('--sample 不能与 -r 同时使用。', err=True, fg=PT_WARNING)
+        return
 
-    offsets = [-Segment(root + a, root + b) for a, b, root in offsets] if offsets else []
-    days = [-Segment(a, b) for a, b, _ in days] if days else []
+    calendar = None
+    if workday is not None or any(isinstance(x, BusinessDays) for a, b, _ in offsets for x in (a, b)):
+        if (calendar := work_calendar()) is None:
+            return
+
+    def shift(root: date, delta: timedelta | BusinessDays) -> date:
+        return calendar.shift(root, delta) if isinstance(delta, BusinessDays) else root + delta
+
+    unit = step or STEP_UNITS['d']
+    offsets = [-Segment(shift(root, a), shift(root, b), unit) for a, b, root in offsets] if offsets else []
+    days = [-Segment(a, b, unit) for a, b, _ in days] if days else []
     ages = [
         # 因为是减法，所以是要base减去a、b中比较大的那个，
         # 才能得到比较小的具体日期，进而令 Segment 的 start <= stop
         Segment(
             date(year - max(a, b), 1, 1),
             date(year - min(a, b), 12, 31),
+            unit,
         )
         for a, b, year in ages
     ] if ages else []
 
-    dates = iter(SegmentSet(offsets + days + ages))
-    dates = filter(lambda d: ZODIACS[(d.year - 4) % 12] in zodiacs, dates) if zodiacs else dates
+    excludes = SegmentSet((-Segment(a, b, unit) for a, b, _ in excludes), unit=unit)
+    dates = SegmentSet(offsets + days + ages, unit=unit) - excludes
+    if dates:
+        lo, hi = dates[0], dates[-1]
+        if zodiacs:
+            dates &= calendars.years(lo, hi, lambda y: ZODIACS[(y - 4) % 12] in zodiacs)
+        if weekdays:
+            dates &= calendars.weekdays(lo, hi, weekdays)
+        if months:
+            dates &= calendars.months(lo, hi, months)
+        if month_days:
+            dates &= calendars.month_days(lo, hi, month_days)
+        if leap_day is not None:
+            dates = (dates.__and__ if leap_day else dates.__sub__)(calendars.leap_days(lo, hi))
+        if workday is not None:
+            dates &= (calendar.workdays if workday else calendar.holidays)(lo, hi)
+    if not dates:
+        click.secho('没有产生任何数据。', err=True, fg=PT_WARNING)
+        return
+
+    if sample:
+        dates = dates.take(sampling.indices(len(dates), sample, seed))
+    total = len(dates)
     dates = map(lambda d: d.strftime(fmt), dates)
-    dates = filter(lambda d: re.fullmatch(regex, d), dates) if regex else dates
-    dates = tuple(dates)
-    if ask(force=force, dataset=dates):
-        print('\n'.join(dates))
+    if regex:
+        dates = filter(lambda d: re.fullmatch(regex, d), dates)
+        with Progress('enumd', total=total) as progress:
+            dates = tuple(progress.track(dates))
+        if not ask(force=force, dataset=dates):
+            return
+        total = len(dates)
+    else:
+        size = fmt_datasize(len(date(1949, 10, 1).strftime(fmt)) * total)
+        if not ask(force=force, tips=f'预估数据量 {total:d} 条，文本 {size}，确定继续？(Y/[n]) '):
+            return
+    with Progress('enumd', total=total) as progress:
+        progress.write(dates)
 
 
 @click.command('enumdt', no_args_is_help=True, short_help='穷举范围内的日期时间')
@@ -169,8 +333,17 @@ def enum_date(
               help='每个 -o 输出范围内的所有时间，范围的左右两边由基于 BASE 的偏移量决定。\n'
                    'BASE 默认是此时此刻。偏移量正则表达为“-?(\\d+[hmsf]){1,}”，\n'
                    '其中后缀“s”表示一秒，1m(分钟)=60s，1h(小时)=60m=3600s，1f(毫秒)=0.001s。')
+@click.option('-x', '--exclude', 'excludes',
+              metavar='MIN[~MAX]', type=RawRange(datetime), multiple=True,
+              help='每个 -x 排除一个时间，或范围内的所有时间。')
 @click.option('-r', '--regex', type=Regex(), help='过滤不能完全匹配正则表达式的(格式化后的)日期。')
-@click.option('-m', '--millisecond', 'is_ms_base', help='以毫秒为单位（默认是秒）进行穷举。')
+@click.option('-m', '--millisecond', 'is_ms_base', is_flag=True, help='以毫秒为单位（默认是秒）进行穷举，等同于 -s ms 。')
+@click.option('-s', '--step', type=Step(), help='递增量，格式为“[N]单位”，单位是 ms、s、min、h、d、w 之一，比如 500ms、15min。')
+@click.option('-e', '--epoch', type=click.Choice(tuple(EPOCH_RESOLUTIONS)),
+              help='输出秒级（s）或毫秒级（ms）时间戳，而不是按 -f 格式化。')
+@click.option('--sample', type=click.IntRange(min=1), metavar='N',
+              help='不穷举，而是从所有时间中不重复地随机抽取 N 个，保持原有顺序。不能与 -r 同时使用。')
+@click.option('--seed', type=int, help='--sample 的随机数种子，相同的种子得到相同的结果。')
 @click.option('-F', '--force', is_flag=True, help='不提示数量，直接穷举输出所有时间。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 def enum_datetime(
@@ -178,8 +351,13 @@ def enum_datetime(
         intervals: tuple[tuple[datetime, datetime, None]],
         stamps: tuple[tuple[float, float, timezone]],
         offsets: tuple[tuple[timedelta, timedelta, datetime]],
+        excludes: tuple[tuple[datetime, datetime, None]],
         regex: Pattern,
         is_ms_base: bool,
+        step: timedelta | None,
+        epoch: str | None,
+        sample: int | None,
+        seed: int | None,
         force: bool,
 ):
     """
@@ -191,17 +369,52 @@ def enum_datetime(
         click.secho('输出格式有误。', err=True, fg=PT_WARNING)
         return
 
+    if sample and regex:
+        click.secho('--sample 不能与 -r 同时使用。', err=True, fg=PT_WARNING)
+        return
+
     def _p(t: float, tz: timezone) -> datetime:
         return datetime.fromtimestamp(t, tz)
 
-    unit = timedelta(microseconds=1) if is_ms_base else timedelta(seconds=1)
+    unit = step or STEP_UNITS['ms' if is_ms_base else 's']
     stamps = [-Segment(_p(a, tz), _p(b, tz), unit) for a, b, tz in stamps] if stamps else []
     offsets = [-Segment(root + a, root + b, unit) for a, b, root in offsets] if offsets else []
-    intervals = [-Segment(a, b) for a, b, _ in intervals] if intervals else []
+    intervals = [-Segment(a, b, unit) for a, b, _ in intervals] if intervals else []
+    moments = SegmentSet(offsets + intervals + stamps, unit=unit)
+    # -x 的时间没有时区，视为与穷举范围同一个时区
+    zone = moments.origin.tzinfo if moments.origin else None
+    excludes = SegmentSet(
+        (-Segment(a.replace(tzinfo=zone), b.replace(tzinfo=zone), unit) for a, b, _ in excludes),
+        unit=unit,
+    )
+
+    moments = moments - excludes
+    if not moments:
+        click.secho('没有产生任何数据。', err=True, fg=PT_WARNING)
+        return
+    if sample:
+        moments = moments.take(sampling.indices(len(moments), sample, seed))
 
-    moments = iter(SegmentSet(offsets + intervals + stamps))
-    moments = map(lambda d: d.strftime(fmt), moments)
+    # 时间戳和大部分格式都直接由整数刻度算出，不必为每个时间构造 datetime
+    scale = unit // MICROSECOND
+    if epoch:
+        resolution = EPOCH_RESOLUTIONS[epoch]
+        base = (moments.origin.astimezone(timezone.utc) - EPOCH.replace(tzinfo=timezone.utc)) // MICROSECOND
+        if base % resolution or scale % resolution:
+            click.secho(f'起点或步长不是整{"秒" if epoch == "s" else "毫秒"}，无法输出整数时间戳。', err=True, fg=PT_WARNING)
+            return
+        moments = map(str, moments.scaled(base // resolution, scale // resolution))
+    else:
+        try:
+            formatter = WallClockFormatter(fmt)
+        except ValueError:
+            moments = map(lambda d: d.strftime(fmt), moments)
+        else:
+            base = (moments.origin.replace(tzinfo=None) - EPOCH) // MICROSECOND
+            moments = formatter(moments.scaled(base, scale))
     moments = filter(lambda d: re.fullmatch(regex, d), moments) if regex else moments
-    moments = tuple(moments)
+    with Progress('enumdt') as progress:
+        moments = tuple(progress.track(moments))
     if ask(force=force, dataset=moments):
-        print('\n'.join(moments))
+        with Progress('enumdt', total=len(moments)) as progress:
+            progress.write(moments)
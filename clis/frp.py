@@ -1,11 +1,127 @@
-import os
+import asyncio
+import re
+import signal
+import subprocess
+import time
+from configparser import ConfigParser, Error as ConfigError
+from pathlib import Path
 from typing import NoReturn, Literal
 
 import click
 
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
 from core.click_chore import AutoReadConfigPaser, cmd, ask, warning, curd
+from core.daemon import replace_process
 from core.style import *
-from .configurator import configurate, get_frp_install_path, find_frp_config
+from core.watcher import watch
+from .configurator import configurate, get_frp_install_path, find_frp_config, find_frp_configs, complete_frp_config
+
+
+def read_frp_config(cfp: Path) -> dict[str, dict[str, str]]:
+    """
+    读取 frp 配置文件的所有节。
+
+    :raise configparser.Error: 配置文件格式有误。
+    """
+    parser = ConfigParser(interpolation=None)
+    with open(cfp, 'r', encoding='UTF-8') as f:
+        parser.read_file(f)
+    return {title: dict(parser.items(title, raw=True)) for title in parser.sections()}
+
+
+def diff_frp_config(
+        old: dict[str, dict[str, str]],
+        new: dict[str, dict[str, str]],
+) -> tuple[bool, set[str]]:
+    """
+    比较 frp 配置的两个版本。
+
+    :return: common 节是否变动，以及有变动（增、删、改）的代理节名称。
+    """
+    common_changed = old.get('common') != new.get('common')
+    proxies = {
+        title for title in (old.keys() | new.keys()) - {'common'}
+        if old.get(title) != new.get(title)
+    }
+    return common_changed, proxies
+
+
+def verify_frp_config(executable: Path, cfp: Path) -> str | None:
+    """
+    使用 frp 自带的 verify 子命令校验配置文件。
+
+    :return: 校验失败时返回 frp 的输出，否则返回 None。
+    """
+    result = subprocess.run(
+        [executable, 'verify', '-c', str(cfp)],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    return result.stdout.strip() if result.returncode != 0 else None
+
+
+def supervise_frp(
+        prefix: Literal['frpc', 'frps'],
+        cfp: Path,
+        debounce: float,
+) -> NoReturn:
+    """
+    以子进程运行 frpc 或 frps，并在配置文件改动后热加载或重启它。
+
+    只有代理节改动时，如果 common 节配置了 admin_port 就调用 frpc reload 热加载，否则重启；
+    common 节改动一律重启；只改了注释、空白等不影响配置的内容时什么都不做。
+
+    :param prefix: 配置文件名前缀。只能是“frpc”和“frps”。
+    :param cfp: 配置文件地址。
+    :param debounce: 配置文件静默多少秒后才处理改动。
+    """
+    executable = cfp.parent / prefix
+    try:
+        current = read_frp_config(cfp)
+    except ConfigError as e:
+        click.secho(f'配置文件格式有误：{e}', err=True, fg=PT_ERROR)
+        return
+    process = subprocess.Popen([executable, '-c', str(cfp)])
+
+    def restart():
+        nonlocal process
+        process.terminate()
+        process.wait()
+        process = subprocess.Popen([executable, '-c', str(cfp)])
+
+    try:
+        for names in watch(cfp.parent, re.escape(prefix) + r'_?.*\.ini', debounce, timeout=1.0):
+            if process.poll() is not None:
+                warning(f'{prefix} 已退出，返回值 {process.returncode}。')
+                return
+            if cfp.name not in names:
+                continue
+            try:
+                latest = read_frp_config(cfp)
+            except (ConfigError, FileNotFoundError) as e:
+                warning(f'配置文件无法读取，保持当前配置运行：{e}')
+                continue
+            common_changed, proxies = diff_frp_config(current, latest)
+            if not common_changed and not proxies:
+                continue
+            if message := verify_frp_config(executable, cfp):
+                warning('配置文件校验失败，保持当前配置运行：', message)
+                continue
+            current = latest
+            if prefix == 'frpc' and not common_changed and 'admin_port' in latest.get('common', {}):
+                click.secho(f'代理 {", ".join(sorted(proxies))} 有变动，热加载配置。', err=True, fg=PT_SPECIAL)
+                subprocess.run([executable, 'reload', '-c', str(cfp)])
+            else:
+                click.secho(f'配置有变动，重启 {prefix}。', err=True, fg=PT_SPECIAL)
+                restart()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if process.poll() is None:
+            process.terminate()
+            process.wait()
 
 
 def run_frp(
@@ -13,6 +129,8 @@ def run_frp(
         filename: str,
         new_configs: tuple[str],
         print_it: bool,
+        watch_it: bool = False,
+        debounce: float = 0.5,
 ) -> NoReturn:
     """
     运行 frpc 或 frps 程序。
@@ -21,6 +139,8 @@ def run_frp(
     :param filename: 配置的简短名称。例如 “full” 代表 “frpc_full.ini”。
     :param new_configs: 多个符合表达式 [SECTION[.KEY[=VALUE]]] 的用户输入。
     :param print_it: 保存后打印当前配置。
+    :param watch_it: 监视配置文件，改动后自动热加载或重启。
+    :param debounce: 配置文件静默多少秒后才处理改动。
     :return: 无。
     """
     try:
@@ -63,14 +183,16 @@ def run_frp(
         with AutoReadConfigPaser(cfp, auto_patch=True) as configs:
             curd(configs, '', False)
 
-    if prefix == 'frpc':
-        os.execl(cfp.parent / 'frpc', 'http', '-c', str(cfp))
+    if watch_it:
+        supervise_frp(prefix, cfp, debounce)
+    elif prefix == 'frpc':
+        replace_process(['http', '-c', str(cfp)], cfp.parent / 'frpc')
     elif prefix == 'frps':
-        pass
+        replace_process(['frps', '-c', str(cfp)], cfp.parent / 'frps')
 
 
 @click.command('frpc', short_help='运行frp客户端')
-@click.option('-c', '--config', 'filename', metavar='NAME',
+@click.option('-c', '--config', 'filename', metavar='NAME', shell_complete=complete_frp_config,
               help='用某个配置文件来运行。提供简短名称。使用 {} 列出所有。'.format(
                   cmd(configurate, "frpc", "--list")
               ))
@@ -78,16 +200,26 @@ def run_frp(
               multiple=True, help='修改并保存配置后再运行。使用多个 -s 来修改多个配置。')
 @click.option('-p', '-print', 'print_it', is_flag=True,
               help='运行前打印文件中的所有配置。')
+@click.option('-w', '--watch', 'watch_it', is_flag=True,
+              help='监视配置文件，改动后自动热加载（需配置 admin_port）或重启。')
+@click.option('--debounce', type=float, default=0.5, show_default=True,
+              help='配置文件静默多少秒后才处理改动。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def run_frpc(filename: str | None, new_configs: tuple[str] | None, print_it: bool):
+def run_frpc(
+        filename: str | None,
+        new_configs: tuple[str] | None,
+        print_it: bool,
+        watch_it: bool,
+        debounce: float,
+):
     """
     运行frp客户端（frpc）。
     """
-    run_frp('frpc', filename, new_configs, print_it)
+    run_frp('frpc', filename, new_configs, print_it, watch_it, debounce)
 
 
 @click.command('frps', short_help='运行frp服务端')
-@click.option('-c', '--config', 'filename', metavar='NAME',
+@click.option('-c', '--config', 'filename', metavar='NAME', shell_complete=complete_frp_config,
               help='用某个配置文件来运行。提供简短名称。使用 {} 列出所有。'.format(
                   cmd(configurate, "frps", "--list")
               ))
@@ -95,6 +227,196 @@ def run_frpc(filename: str | None, new_configs: tuple[str] | None, print_it: boo
               multiple=True, help='修改并保存配置后再运行。使用多个 -s 来修改多个配置。')
 @click.option('-p', '-print', 'print_it', is_flag=True,
               help='运行前打印文件中的所有配置。')
+@click.option('-w', '--watch', 'watch_it', is_flag=True,
+              help='监视配置文件，改动后自动热加载（需配置 admin_port）或重启。')
+@click.option('--debounce', type=float, default=0.5, show_default=True,
+              help='配置文件静默多少秒后才处理改动。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+def run_frps(
+        filename: str | None,
+        new_configs: tuple[str] | None,
+        print_it: bool,
+        watch_it: bool,
+        debounce: float,
+):
+    run_frp('frps', filename, new_configs, print_it, watch_it, debounce)
+
+
+class FrpInstance(object):
+
+    def __init__(self, scope: Literal['frpc', 'frps'], name: str, cfp: Path):
+        """
+        由 yu frp up 托管的一个 frpc 或 frps 进程。
+
+        :param scope: 运行 frpc 还是 frps。
+        :param name: 配置文件的简短名称。
+        :param cfp: 配置文件地址。
+        """
+        self.scope = scope
+        self.name = name
+        self.cfp = cfp
+        self.state = '等待'
+        self.pid: int | None = None
+        self.since = time.monotonic()
+        self.restarts = 0
+        self.returncode: int | None = None
+
+    @property
+    def label(self) -> str:
+        return f'{self.scope}:{self.name}' if self.name else self.scope
+
+    def _echo(self, line: bytes) -> NoReturn:
+        click.secho(f'[{self.label}] ', nl=False, fg=PT_CONF_KEY)
+        click.echo(line.decode(errors='replace').rstrip())
+
+    async def _relay(self, stream: asyncio.StreamReader) -> NoReturn:
+        """
+        逐行转发进程的输出。超过缓冲区上限的长行分段转发，不会中断。
+        """
+        split = False
+        while True:
+            try:
+                line = await stream.readuntil(b'\n')
+            except asyncio.IncompleteReadError as e:
+                if e.partial:
+                    self._echo(e.partial)
+                return
+            except asyncio.LimitOverrunError as e:
+                split = True
+                self._echo(await stream.readexactly(e.consumed))
+                continue
+            # 长行分段后只剩下换行符时不再单独输出一行
+            if not (split and line == b'\n'):
+                self._echo(line)
+            split = False
+
+    async def run(self, backoff: float, max_backoff: float, stable: float) -> NoReturn:
+        """
+        运行并守护进程。进程退出或无法启动时按指数退避重启；平稳运行 stable 秒以上再退出时，退避时间重新计算。
+        """
+        delay = backoff
+        while True:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.cfp.parent / self.scope, '-c', str(self.cfp),
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                )
+            except OSError as e:
+                self.state, self.pid, self.since = '退避', None, time.monotonic()
+                warning(f'[{self.label}] 无法启动：{e}，{delay:g} 秒后重试。')
+            else:
+                self.state, self.pid, self.since = '运行', process.pid, time.monotonic()
+                try:
+                    await self._relay(process.stdout)
+                    self.returncode = await process.wait()
+                finally:
+                    if process.returncode is None:
+                        process.terminate()
+                        await process.wait()
+                if time.monotonic() - self.since >= stable:
+                    delay = backoff
+                self.state, self.pid, self.since = '退避', None, time.monotonic()
+                warning(f'[{self.label}] 已退出，返回值 {self.returncode}，{delay:g} 秒后重启。')
+            await asyncio.sleep(delay)
+            self.restarts += 1
+            delay = min(delay * 2, max_backoff)
+
+
+def print_frp_status(instances: list[FrpInstance]) -> NoReturn:
+    table = Table('实例', '状态', 'PID', '持续时长', '重启次数', '上次返回值', '配置文件', box=box.SIMPLE_HEAD)
+    now = time.monotonic()
+    for inst in instances:
+        table.add_row(
+            inst.label, inst.state,
+            str(inst.pid or '-'), f'{now - inst.since:.0f}s', str(inst.restarts),
+            '-' if inst.returncode is None else str(inst.returncode), inst.cfp.name,
+        )
+    Console(stderr=True).print(table)
+
+
+async def supervise_all_frp(
+        instances: list[FrpInstance],
+        backoff: float,
+        max_backoff: float,
+        stable: float,
+        status_interval: float,
+) -> NoReturn:
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    try:
+        loop.add_signal_handler(signal.SIGINT, stopping.set)
+        loop.add_signal_handler(signal.SIGTERM, stopping.set)
+        loop.add_signal_handler(signal.SIGUSR1, print_frp_status, instances)
+    except (NotImplementedError, AttributeError):
+        pass  # Windows 下只能依赖 KeyboardInterrupt
+
+    tasks = [asyncio.create_task(inst.run(backoff, max_backoff, stable)) for inst in instances]
+    try:
+        while not stopping.is_set():
+            try:
+                await asyncio.wait_for(stopping.wait(), status_interval or None)
+            except asyncio.TimeoutError:
+                print_frp_status(instances)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for inst in instances:
+            inst.state, inst.pid = '停止', None
+        print_frp_status(instances)
+
+
+@click.group('frp', short_help='批量托管 frp 客户端和服务端')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def run_frps(filename: str | None, new_configs: tuple[str] | None, print_it: bool):
-    run_frp('frps', filename, new_configs, print_it)
+def manage_frp():
+    """
+    批量托管 frp 客户端（frpc）和服务端（frps）。
+    """
+
+
+@manage_frp.command('up', short_help='运行并守护所有 frp 配置')
+@click.option('-s', '--scope', 'scopes', type=click.Choice(['frpc', 'frps']), multiple=True,
+              help='只运行 frpc 或 frps 的配置。默认两者都运行。')
+@click.option('-c', '--config', 'names', metavar='NAME', multiple=True, shell_complete=complete_frp_config,
+              help='只运行这些简短名称的配置。可填多个。默认运行所有配置。')
+@click.option('--backoff', type=float, default=1.0, show_default=True, help='首次重启前等待的秒数，之后每次翻倍。')
+@click.option('--max-backoff', type=float, default=60.0, show_default=True, help='重启前最多等待的秒数。')
+@click.option('--stable', type=float, default=30.0, show_default=True,
+              help='进程持续运行多少秒后才认为平稳，重置退避时间。')
+@click.option('--status', 'status_interval', type=float, default=0, metavar='SECONDS',
+              help='每隔多少秒打印一次状态表。发送 SIGUSR1 信号也会打印。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+def start_all_frp(
+        scopes: tuple[str],
+        names: tuple[str],
+        backoff: float,
+        max_backoff: float,
+        stable: float,
+        status_interval: float,
+):
+    """
+    运行 frp 安装目录下找到的所有配置，输出带实例前缀的日志，并在进程崩溃后自动重启。
+    """
+    try:
+        path = get_frp_install_path()
+    except (KeyError, FileNotFoundError, TypeError):
+        warning(
+            '请先使用以下命令设置 frp 的安装目录：',
+            cmd(configurate, 'yudo', 'frp.path=YOUR_INSTALL_PATH'),
+        )
+        return
+
+    instances = [
+        FrpInstance(scope, name, info[0] / info[1])
+        for scope in (scopes or ('frpc', 'frps'))
+        for name, info in sorted(find_frp_configs(path, scope).items())
+        if not names or name in names
+    ]
+    if not instances:
+        warning('没有找到任何 frp 配置。')
+        return
+
+    try:
+        asyncio.run(supervise_all_frp(instances, backoff, max_backoff, stable, status_interval))
+    except KeyboardInterrupt:
+        pass
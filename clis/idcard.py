@@ -1,23 +1,47 @@
-import json
 import sys
-from typing import Any, Sequence, Iterable
-from datetime import date
-from itertools import product
-from math import ceil
+from collections import Counter
+from functools import lru_cache
+from io import TextIOWrapper
+from json import JSONEncoder
+from multiprocessing import Pool
+from typing import Any, Final, NoReturn, Sequence, Iterable, Iterator
+from calendar import isleap
+from datetime import date, MINYEAR, MAXYEAR
+from itertools import chain, product, repeat
+from math import ceil, prod
+from operator import getitem, mul
 
-from click import Parameter, Context, ParamType, command, option, help_option
+from click import (
+    Parameter, Context, ParamType, IntRange, File,
+    command, group, argument, option, help_option, secho, get_text_stream,
+)
+from rich import box
+from rich.console import Console
+from rich.table import Table
 
+from clis.adcode import lazy_load
 from core.click_chore import fmt_datasize, ask
+from core.progress import Progress
+from core.sampling import indices, unrank
 from core.structs import SegmentSet, Segment
+from core.style import *
 
 RIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
-
-
-def mk_date(year: int, month: int, day: int) -> str | None:
-    try:
-        return date(year, month, day).strftime('%Y%m%d')
-    except ValueError:
-        return None
+# 平年每个月的天数，下标即月份
+MONTH_LENGTHS: Final = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+DAY_STRINGS: Final = tuple(f'{d:02d}' for d in range(31 + 1))
+CHECKSUMS: Final = '10X98765432'
+# 直接对ASCII码加权求和，再减去每一位都是“0”（48）时的加权和
+ZERO_WEIGHT: Final = ord('0') * sum(RIGHTS)
+# 校验失败的类别，按检查的先后排列
+ERRORS: Final = {
+    'format': '格式',
+    'adcode': '区划代码',
+    'birth': '出生日期',
+    'checksum': '校验码',
+}
+CHECK_COLUMNS: Final = ('number', 'error')
+DECODE_COLUMNS: Final = ('province', 'city', 'county', 'birth', 'gender', 'age')
 
 
 def enum_adcode(
@@ -25,8 +49,7 @@ def enum_adcode(
         cities: Sequence = None,
         counties: Sequence = None,
 ) -> Iterable:
-    with open(r'./code2022.json', 'r', encoding='UTF-8') as f:
-        ad_codes = tuple(k[:6] for k in json.load(f).keys() if k.endswith('000000'))
+    ad_codes = tuple(k[:6] for k in lazy_load().keys() if k.endswith('000000'))
     codes = (c for c in ad_codes if not c.endswith('0000'))
     codes = (c for c in codes if c[0:2] in provinces) if provinces else codes
     codes = (c for c in codes if c[2:4] in cities) if cities else codes
@@ -34,17 +57,36 @@ def enum_adcode(
     return codes
 
 
+def month_length(year: int, month: int) -> int:
+    """
+    某年某月的天数。年份或月份无效时为0。
+    """
+    if not (MINYEAR <= year <= MAXYEAR and 1 <= month <= 12):
+        return 0
+    return 29 if month == 2 and isleap(year) else MONTH_LENGTHS[month]
+
+
 def enum_birth_by_ymd(
         year: Iterable = None,
         month: Iterable = None,
         day: Iterable = None,
 ) -> Iterable:
-    day = day if day else range(1, 31 + 1)
+    """
+    按年、月、日的笛卡尔积产出有效日期的“YYYYMMDD”字符串，顺序与 itertools.product 一致。
+
+    每个月的有效日期由月份天数表直接算出，不构造 date 对象，也不会因为无效日期抛出异常。
+    """
     year = year if year else range(1900, 2100 + 1)
     month = month if month else range(1, 12 + 1)
-    dates = (mk_date(y, m, d) for y, m, d in product(year, month, day))
-    dates = filter(None, dates)
-    return dates
+    if not day:  # 默认是每月的所有天，直接切片
+        for y, m in product(year, month):
+            prefix = f'{y:04d}{m:02d}'
+            yield from map(prefix.__add__, DAY_STRINGS[1:month_length(y, m) + 1])
+        return
+    day = tuple(day)
+    for y, m in product(year, month):
+        prefix, last = f'{y:04d}{m:02d}', month_length(y, m)
+        yield from (prefix + DAY_STRINGS[d] for d in day if 1 <= d <= last)
 
 
 def enum_birth_by_age(ages: Iterable, base: date = date.today()):
@@ -55,7 +97,7 @@ def enum_birth_by_age(ages: Iterable, base: date = date.today()):
         )
         for age in ages
     ])
-    return iter(ms)
+    return map(date.strftime, ms, repeat('%Y%m%d'))
 
 
 def enum_seq(male: bool = False, female: bool = False) -> Iterable:
@@ -126,12 +168,15 @@ class Checksum(ParamType):
 @option('-M', '--male', is_flag=True, help='男性。')
 @option('-F', '--female', is_flag=True, help='女性。男女同时选择等效于同时不选择。')
 @option('-s', '--checksum', multiple=True, help='校验码。身份证最后一位。可输入多个。')
+@option('--sample', type=IntRange(min=1), metavar='N',
+        help='不穷举，而是从所有号码中不重复地随机抽取 N 个，保持原有顺序。不能与 -s 同时使用。')
+@option('--seed', type=int, help='--sample 的随机数种子，相同的种子得到相同的结果。')
 @option('-f', '--force', is_flag=True, help='不提示数量，直接输出。')
 @help_option('-h', '--help', help='列出这份帮助信息。')
 def enum_prcid(
         province, city, county,
         year, month, day, age,
-        male, female, checksum, force,
+        male, female, checksum, sample, seed, force,
 ):
     """
     穷举所有可能的身份证号码。【已废弃】
@@ -152,14 +197,190 @@ def enum_prcid(
     if checksum and not all(c in '0123456789X' for c in checksum):
         print('每个校验码只能为 0、1、2、3、4、5、6、7、8、9、X 之一。', file=sys.stderr)
         return
+    if sample and checksum:
+        print('--sample 不能与 -s 同时使用。', file=sys.stderr)
+        return
 
     qty = len(seqs) * len(codes) * len(births)
     qty = ceil(qty / 11 * len(checksum)) if checksum else qty
+    qty = min(qty, sample) if sample else qty
     dsz = fmt_datasize(qty * 20)
     tip = f'预估数据量 {qty:d} 条，文本 {dsz}，确定继续？(Y/n)'
     if not ask(force=force, tips=tip):
         return
 
-    ids = map(patch_checksum, product(codes, births, seqs))
+    if sample:
+        # 号码空间是行政区划代码、出生日期、序列号三列的笛卡尔积，下标按混合进制解码
+        columns = (codes, births, seqs)
+        radices = tuple(map(len, columns))
+        rows = (
+            tuple(map(getitem, columns, unrank(i, radices)))
+            for i in indices(prod(radices), sample, seed)
+        )
+    else:
+        rows = product(codes, births, seqs)
+    ids = map(patch_checksum, rows)
     ids = filter(lambda i: i[-1] in checksum, ids) if checksum else ids
-    print('\n'.join(ids))
+    with Progress('enumidc', total=None if checksum else qty) as progress:
+        progress.write(ids)
+
+
+@lru_cache(maxsize=None)
+def parse_birth(text: str) -> date | None:
+    # 同一个出生日期会反复出现，缓存后每个日期只解析一次
+    try:
+        return date(int(text[:4]), int(text[4:6]), int(text[6:8]))
+    except ValueError:
+        return None
+
+
+def region_name(codes: dict, code: str) -> str | None:
+    name = codes.get(code)
+    return name if name is None or name.__class__ is str else name['name']
+
+
+def check_number(number: str, codes: dict, today: date, decode: bool = False) -> tuple:
+    """
+    校验一个身份证号码：格式、区划代码、出生日期、校验码，遇到第一个错误即停止。
+
+    :param codes: 区划代码数据集，即 adcode.lazy_load() 的结果。
+    :param today: 出生日期不能晚于这一天，年龄也按这一天计算。
+    :param decode: 是否附带解码出的省、市、县、出生日期、性别和年龄。
+    :return: (号码, 错误类别或 None) ，decode 时再附加 DECODE_COLUMNS 各列（号码无效时都为 None）。
+    """
+    number = number.upper()
+    error, birth = None, None
+    if len(number) != 18 or not (number[:17].isascii() and number[:17].isdigit()) or number[17] not in CHECKSUMS:
+        error = 'format'
+    elif f'{number[:6]}000000' not in codes:
+        error = 'adcode'
+    elif (birth := parse_birth(number[6:14])) is None or birth > today:
+        error = 'birth'
+    elif CHECKSUMS[(sum(map(mul, number[:17].encode(), RIGHTS)) - ZERO_WEIGHT) % 11] != number[17]:
+        error = 'checksum'
+    if not decode:
+        return number, error
+    if error:
+        return (number, error) + (None,) * len(DECODE_COLUMNS)
+    return (
+        number, None,
+        region_name(codes, f'{number[:2]}0000000000'),
+        region_name(codes, f'{number[:4]}00000000'),
+        region_name(codes, f'{number[:6]}000000'),
+        birth.isoformat(),
+        '男' if int(number[16]) % 2 else '女',
+        today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day)),
+    )
+
+
+def format_rows(rows: Iterable[tuple], columns: Sequence[str], tsv: bool) -> Iterator[str]:
+    if tsv:
+        return ('\t'.join('' if v is None else str(v) for v in row) for row in rows)
+    dumps = JSONEncoder(ensure_ascii=False, check_circular=False).encode
+    return (dumps(dict(zip(columns, row))) for row in rows)
+
+
+def _check_chunk(args: tuple[list[str], date, bool, bool | None, bool]) -> tuple[list[str], Counter]:
+    """
+    校验一批号码（空行忽略），只保留 keep 指定的行并格式化，同时按错误类别计数。
+    """
+    lines, today, decode, keep, tsv = args
+    codes = lazy_load()
+    rows, errors = [], Counter()
+    for line in lines:
+        if not (number := line.strip()):
+            continue
+        row = check_number(number, codes, today, decode)
+        errors[row[1]] += 1
+        if keep is None or keep is (row[1] is None):
+            rows.append(row)
+    columns = CHECK_COLUMNS + DECODE_COLUMNS if decode else CHECK_COLUMNS
+    return list(format_rows(rows, columns, tsv)), errors
+
+
+def check_numbers(
+        lines: Iterable[str],
+        today: date,
+        decode: bool,
+        keep: bool | None,
+        tsv: bool,
+        jobs: int,
+        errors: Counter,
+) -> Iterator[str]:
+    """
+    按原有顺序逐行产出格式化后的校验结果，并把各类错误的数量累加到 errors（None 表示有效）。
+
+    jobs 大于1时按行分块交给多个进程，校验和格式化都在子进程中完成，imap 保证结果仍按输入的顺序产出。
+    """
+    chunks = iter(lambda: [line for _, line in zip(range(1 << 14), lines)], [])
+    tasks = ((chunk, today, decode, keep, tsv) for chunk in chunks)
+    if jobs <= 1:
+        parts = map(_check_chunk, tasks)
+    else:
+        lazy_load()  # 在 fork 之前加载，子进程直接继承
+        pool = Pool(jobs)
+        parts = pool.imap(_check_chunk, tasks)
+    try:
+        for rows, counts in parts:
+            errors.update(counts)
+            yield from rows
+    finally:
+        if jobs > 1:
+            pool.terminate()
+
+
+def print_check_summary(errors: Counter) -> NoReturn:
+    total = sum(errors.values())
+    table = Table('结果', '行数', '占比', title=f'共校验 {total} 个号码', box=box.SIMPLE_HEAD)
+    for key, label in (('valid', '有效'), *ERRORS.items()):
+        count = errors[None if key == 'valid' else key]
+        table.add_row(label if key == 'valid' else f'{label}错误', str(count), f'{count / total:.2%}' if total else '-')
+    Console(stderr=True).print(table)
+
+
+@group('idc', short_help='身份证号码相关的工具')
+@help_option('-h', '--help', help='列出这份帮助信息。')
+def prcid_tools():
+    """
+    身份证号码相关的工具。
+    """
+
+
+@prcid_tools.command('check', short_help='批量校验身份证号码')
+@argument('files', nargs=-1, type=File(encoding='UTF-8', errors='replace'))
+@option('-d', '--decode', is_flag=True, help='同时输出解码出的省、市、县、出生日期、性别和年龄。')
+@option('--valid/--invalid', 'keep', default=None, help='只输出有效的 / 无效的号码。默认都输出。')
+@option('-t', '--tsv', is_flag=True, help='以 TSV 格式输出（带表头），默认每行输出一个 JSON 对象。')
+@option('-j', '--jobs', type=IntRange(min=1), default=1, help='校验时使用多少个进程。输出顺序与输入一致。')
+@option('-q', '--quiet', is_flag=True, help='不在最后输出各类错误的统计。')
+@help_option('-h', '--help', help='列出这份帮助信息。')
+def check_prcid(
+        files: tuple[TextIOWrapper],
+        decode: bool,
+        keep: bool | None,
+        tsv: bool,
+        jobs: int,
+        quiet: bool,
+):
+    """
+    逐行校验 FILES（不提供则读取标准输入）中的身份证号码：
+    格式、区划代码（按2022年的区划，已撤销的区划视为无效）、出生日期、校验码，每个号码只报告第一个错误。
+
+    最后在标准错误输出各类错误的数量。
+    """
+    try:
+        lazy_load()
+    except FileNotFoundError:
+        secho('缺少区划代码数据文件 code2022.json 。', err=True, fg=PT_ERROR)
+        sys.exit(1)
+
+    streams = files if files else (get_text_stream('stdin', errors='replace'),)
+    lines = (line for f in streams for line in f)
+    columns = CHECK_COLUMNS + DECODE_COLUMNS if decode else CHECK_COLUMNS
+    header = ('\t'.join(columns),) if tsv else ()
+    errors = Counter()
+    rows = check_numbers(lines, date.today(), decode, keep, tsv, jobs, errors)
+    with Progress('idc check') as progress:
+        progress.write(chain(header, rows))
+    if not quiet:
+        print_check_summary(errors)
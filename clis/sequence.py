@@ -1,11 +1,15 @@
 from io import TextIOWrapper
 from itertools import product
+from math import prod
+from operator import getitem
 from re import fullmatch
 from typing import Pattern
 
 import click
 
 from core.click_chore import Regex, ask
+from core.progress import Progress
+from core.sampling import indices, unrank
 from core.style import *
 
 RIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
@@ -22,9 +26,13 @@ def patch_prc_checksum(number: str | tuple[str]) -> str:
 @click.option('-m', '--repeat', 'repetition', type=int, default=1, help='重复次数（将所有列作为一个整体进行重复）。')
 @click.option('-0', '--skip-empty', is_flag=True, help='跳过行数为0的列。如果不选此项，'
                                                        '那么任意一列行数为0都会导致没有输出。')
-@click.option('--patch-prc-sum', is_flag=True, help='计算并追加每个身份证号码的校验值。号码长度不能低于17位。')
+@click.option('--patch-prc-sum', is_flag=True, help='计算并追加每个身份证号码的校验值。号码长度不能低于17位。'
+                                                 '与 -f 同时使用时先补校验值，格式中的序号代表号码的第几位。')
 @click.option('-f', '--format', 'fmt', help=r'用格式渲染每一行结果。每列用“{列序号}”代表，序号从0开始。')
 @click.option('-r', '--regex', type=Regex(), help='过滤不能完全匹配正则表达式的结果。')
+@click.option('--sample', type=click.IntRange(min=1), metavar='N',
+              help='不求全部结果，而是从中不重复地随机抽取 N 行，保持原有顺序。不能与 -r 同时使用。')
+@click.option('--seed', type=int, help='--sample 的随机数种子，相同的种子得到相同的结果。')
 @click.option('-F', '--force', is_flag=True, help='不提示，直接输出。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 def product_columns(
@@ -34,6 +42,8 @@ def product_columns(
         patch_prc_sum: bool,
         fmt: str,
         regex: Pattern,
+        sample: int | None,
+        seed: int | None,
         force: bool,
 ):
     """
@@ -45,17 +55,33 @@ def product_columns(
     if repetition < 1:
         click.secho('重复次数不能小于1。', err=True, fg=PT_ERROR)
         return
+    if sample and regex:
+        click.secho('--sample 不能与 -r 同时使用。', err=True, fg=PT_WARNING)
+        return
+
+    columns = [f.read().splitlines() for f in files]
+    columns = columns if skip_empty else list(filter(None, columns))
+    qty = prod(map(len, columns))
+    if qty == 0:
+        click.secho('没有产生任何数据。', err=True, fg=PT_WARNING)
+        return
 
-    if skip_empty:
-        data = product(*(f.readlines() for f in files))
+    if sample:
+        # 第 i 行由 i 的混合进制各位（每一位的进制是对应列的行数）直接取出，不必展开整个笛卡尔积
+        radices = tuple(map(len, columns))
+        data = (tuple(map(getitem, columns, unrank(i, radices))) for i in indices(qty, sample, seed))
+        qty = min(qty, sample)
     else:
-        data = product(*filter(None, (f.readlines() for f in files)))
+        data = product(*columns)
     if patch_prc_sum:
         data = map(patch_prc_checksum, data)
     if fmt:
         data = map(lambda s: fmt.format(*s), data)
+    elif not patch_prc_sum:
+        data = map(''.join, data)
     if regex:
         data = filter(lambda s: fullmatch(regex, ''.join(s)), data)
 
-    if ask(force=force, dataset=data):
-        print('\n'.join(data))
+    if ask(force=force, tips=f'预估数据量 {qty:d} 条，确定继续？(Y/[n]) '):
+        with Progress('product', total=None if regex else qty) as progress:
+            progress.write(data)
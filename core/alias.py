@@ -0,0 +1,110 @@
+import os
+import re
+import shlex
+import shutil
+import typing
+
+from core.schema import Field
+
+PLACEHOLDER: typing.Final = re.compile(r'@\(([^)]*)\)')
+# 出现这些字符时命令行依赖 shell 的语法（管道、重定向、变量、通配符等），只能交给 shell 执行
+SHELL_SYNTAX: typing.Final = re.compile(r'[|&;<>()$`\\*?\[\]{}~!#%^\n]')
+
+
+class AliasTemplate(object):
+
+    def __init__(self, command: str):
+        """
+        预先解析好的指令模板。命令行中的 @(key) 是占位符，执行前替换为具体的值。
+
+        :param command: 指令的命令行。
+        """
+        self.command = command
+        self.parts: tuple[str, ...] = tuple(PLACEHOLDER.split(command))
+        self.keys: tuple[str, ...] = tuple(dict.fromkeys(self.parts[1::2]))
+        literal = ''.join(self.parts[0::2])
+        self.simple = not SHELL_SYNTAX.search(literal)
+        self.tokens: tuple[tuple[str, ...], ...] | None = None
+        if self.simple:
+            try:
+                self.tokens = self._tokenize()
+            except ValueError:
+                self.simple = False
+
+    def _tokenize(self) -> tuple[tuple[str, ...], ...]:
+        # 先把占位符换成私用区字符包裹的序号，免得 @(key) 里的空格被 shlex 当作分隔符
+        occurrences = self.parts[1::2]
+        marked = ''.join(
+            f'\ue000{i // 2}\ue000' if i % 2 else part
+            for i, part in enumerate(self.parts)
+        )
+        return tuple(
+            tuple(occurrences[int(p)] if i % 2 else p for i, p in enumerate(token.split('\ue000')))
+            for token in shlex.split(marked)
+        )
+
+    def __repr__(self) -> str:
+        return f'<AliasTemplate({self.command!r})>'
+
+    def __str__(self) -> str:
+        return self.command
+
+    @staticmethod
+    def _fill(parts: tuple[str, ...], values: typing.Mapping[str, str]) -> str:
+        return ''.join(
+            values[part] if i % 2 else part
+            for i, part in enumerate(parts)
+        )
+
+    def render(self, values: typing.Mapping[str, str]) -> str:
+        """
+        替换所有占位符，得到交给 shell 执行的命令行。
+
+        :raise KeyError: 缺少某个占位符的值。
+        """
+        return self._fill(self.parts, values)
+
+    def argv(self, values: typing.Mapping[str, str]) -> list[str] | None:
+        """
+        替换所有占位符，得到无需 shell 即可执行的参数列表。
+
+        占位符的值始终作为参数的一部分，不会被再次拆分或被 shell 解释。
+
+        :return: 命令行依赖 shell 语法，或者找不到可执行文件（比如 shell 内置命令）时返回 None。
+        :raise KeyError: 缺少某个占位符的值。
+        """
+        if not self.simple or not self.tokens:
+            return None
+        argv = [self._fill(token, values) for token in self.tokens]
+        if shutil.which(argv[0]) is None:
+            return None
+        return argv
+
+    def resolve(
+            self,
+            values: typing.Mapping[str, str],
+            environ: typing.Mapping[str, str] = os.environ,
+            ask: typing.Callable[[str], str] = None,
+    ) -> dict[str, str]:
+        """
+        依次从 values、环境变量 YU_<KEY>、ask 获取每个占位符的值。同名占位符只取一次值。
+
+        :raise KeyError: 没有提供 ask，且缺少某个占位符的值。
+        """
+        resolved = {}
+        for key in self.keys:
+            if key in values:
+                resolved[key] = values[key]
+            elif (env := f'YU_{key.upper()}') in environ:
+                resolved[key] = environ[env]
+            elif ask is not None:
+                resolved[key] = ask(key)
+            else:
+                raise KeyError(key)
+        return resolved
+
+
+class Alias(Field):
+
+    def convert(self, text: str) -> AliasTemplate:
+        return AliasTemplate(text)
@@ -0,0 +1,251 @@
+"""
+把日历条件转换为日期区间的集合。
+
+每个函数都返回 [start, stop] 之内（可能略超出）满足条件的所有日期，以 SegmentSet 表示。
+与待穷举的日期求交集即可完成过滤，不满足条件的日期根本不会被生成，计数也无需枚举。
+
+WorkCalendar 则把工作日和节假日的定义按年编译为位图，第 i 位表示当年第 i+1 天是否为工作日。
+"""
+import csv
+from calendar import monthrange, isleap
+from configparser import ConfigParser, Error as ConfigError
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Collection, Iterator, Iterable, Final
+
+from core.structs import Segment, SegmentSet
+
+DAY = timedelta(days=1)
+DATE_FORMAT: Final = '%Y.%m.%d'
+
+
+def _runs(values: Collection[int]) -> Iterator[tuple[int, int]]:
+    # 把整数集合拆成若干段连续的 [a, b]
+    values = sorted(values)
+    for i, value in enumerate(values):
+        if i == 0 or values[i - 1] != value - 1:
+            start = value
+        if i == len(values) - 1 or values[i + 1] != value + 1:
+            yield start, value
+
+
+def years(start: date, stop: date, keep: Callable[[int], bool]) -> SegmentSet:
+    """
+    :param keep: 判断某一年是否满足条件，比如按生肖筛选。
+    """
+    return SegmentSet(
+        Segment(date(y, 1, 1), date(y, 12, 31))
+        for y in range(start.year, stop.year + 1) if keep(y)
+    )
+
+
+def months(start: date, stop: date, numbers: Collection[int]) -> SegmentSet:
+    """
+    :param numbers: 月份，1~12。
+    """
+    runs = tuple(_runs(numbers))
+    return SegmentSet(
+        Segment(date(y, a, 1), date(y, b, monthrange(y, b)[1]))
+        for y in range(start.year, stop.year + 1)
+        for a, b in runs
+    )
+
+
+def month_days(start: date, stop: date, numbers: Collection[int]) -> SegmentSet:
+    """
+    :param numbers: 每月的第几天，1~31。超出当月天数的会被忽略。
+    """
+    runs = tuple(_runs(numbers))
+
+    def segments():
+        for y in range(start.year, stop.year + 1):
+            for m in range(1, 12 + 1):
+                last = monthrange(y, m)[1]
+                for a, b in runs:
+                    if a <= last:
+                        yield Segment(date(y, m, a), date(y, m, min(b, last)))
+
+    return SegmentSet(segments())
+
+
+def weekdays(start: date, stop: date, numbers: Collection[int]) -> SegmentSet:
+    """
+    :param numbers: 星期几，1~7 分别是星期一到星期日。
+    """
+    runs = tuple(_runs(numbers))
+    monday = start - DAY * start.weekday()
+    weeks = (stop - monday).days // 7 + 1
+    return SegmentSet(
+        Segment(week + DAY * (a - 1), week + DAY * (b - 1))
+        for week in (monday + DAY * 7 * i for i in range(weeks))
+        for a, b in runs
+    )
+
+
+def leap_days(start: date, stop: date) -> SegmentSet:
+    """
+    所有闰日（2月29日）。
+    """
+    return SegmentSet(
+        Segment(date(y, 2, 29), date(y, 2, 29))
+        for y in range(start.year, stop.year + 1) if isleap(y)
+    )
+
+
+def parse_dates(text: str) -> Iterator[date]:
+    """
+    解析以逗号分隔的日期或日期范围，比如“2024.02.04, 2024.02.10~2024.02.17”。
+
+    :raise ValueError: 格式有误。
+    """
+    for part in filter(None, map(str.strip, text.split(','))):
+        a, _, b = part.partition('~')
+        start = datetime.strptime(a.strip(), DATE_FORMAT).date()
+        stop = datetime.strptime(b.strip(), DATE_FORMAT).date() if b else start
+        yield from Segment(*sorted((start, stop)))
+
+
+class WorkCalendar(object):
+    FILES: Final = ('holidays.ini', 'holidays.csv')
+
+    def __init__(self, holidays: Iterable[date] = (), workdays: Iterable[date] = (), weekend: Collection[int] = (6, 7)):
+        """
+        工作日历。默认除 weekend 以外都是工作日，holidays 是放假的日子，workdays 是调休上班的日子。
+
+        :param weekend: 每周休息的是星期几，1~7 分别是星期一到星期日。
+        """
+        self._weekend = frozenset(weekend)
+        self._changes: dict[int, tuple[set[int], set[int]]] = {}
+        for d in holidays:
+            self._changes.setdefault(d.year, (set(), set()))[0].add(self._index(d))
+        for d in workdays:
+            self._changes.setdefault(d.year, (set(), set()))[1].add(self._index(d))
+        self._years: dict[int, int] = {}
+
+    @staticmethod
+    def _index(d: date) -> int:
+        return d.toordinal() - date(d.year, 1, 1).toordinal()
+
+    @classmethod
+    def load(cls, directory: Path) -> "WorkCalendar":
+        """
+        读取 directory 下的 holidays.ini 和 holidays.csv（都是可选的）。
+
+        holidays.ini 的 [holiday] 和 [workday] 两节中，每个键是一个名称，值是逗号分隔的日期或日期范围；
+        holidays.csv 有 date、type 两列，type 是 holiday 或 workday。日期的格式都是 yyyy.mm.dd 。
+
+        :raise ValueError: 文件格式有误。
+        """
+        holidays, workdays = [], []
+        kinds = {'holiday': holidays, 'workday': workdays}
+        ini, table = (directory / name for name in cls.FILES)
+        if ini.exists():
+            parser = ConfigParser(interpolation=None)
+            try:
+                parser.read(ini, encoding='UTF-8')
+            except ConfigError:
+                raise ValueError(f'{ini.name} 格式有误。')
+            for kind, dates in kinds.items():
+                for name, text in parser.items(kind) if parser.has_section(kind) else ():
+                    try:
+                        dates.extend(parse_dates(text))
+                    except ValueError:
+                        raise ValueError(f'{ini.name} 中 {kind}.{name} 的日期有误：{text}')
+        if table.exists():
+            with open(table, encoding='UTF-8', newline='') as f:
+                for line, row in enumerate(csv.DictReader(f), start=2):
+                    try:
+                        kinds[row['type'].strip()].extend(parse_dates(row['date']))
+                    except (KeyError, AttributeError, ValueError):
+                        raise ValueError(f'{table.name} 第 {line} 行有误。')
+        return cls(holidays, workdays)
+
+    def year(self, year: int) -> int:
+        """
+        某一年的工作日位图，第一次用到时才编译。
+        """
+        if (bits := self._years.get(year)) is not None:
+            return bits
+        days = 366 if isleap(year) else 365
+        first = date(year, 1, 1).weekday()
+        week = sum(1 << i for i in range(7) if (first + i) % 7 + 1 not in self._weekend)
+        bits = week * ((1 << 7 * 53) - 1) // 0x7F  # 把7位的一周重复53次
+        bits &= (1 << days) - 1
+        holidays, workdays = self._changes.get(year, ((), ()))
+        for i in holidays:
+            bits &= ~(1 << i)
+        for i in workdays:
+            bits |= 1 << i
+        self._years[year] = bits
+        return bits
+
+    def is_workday(self, d: date) -> bool:
+        return bool(self.year(d.year) >> self._index(d) & 1)
+
+    @staticmethod
+    def _runs(year: int, bits: int) -> Iterator[Segment]:
+        first = date(year, 1, 1).toordinal()
+        while bits:
+            start = (bits & -bits).bit_length() - 1
+            ones = bits >> start
+            length = (ones ^ (ones + 1)).bit_length() - 1  # 末尾连续的1的个数
+            yield Segment(date.fromordinal(first + start), date.fromordinal(first + start + length - 1))
+            bits &= ~(((1 << length) - 1) << start)
+
+    def workdays(self, start: date, stop: date) -> SegmentSet:
+        return SegmentSet(
+            segment
+            for y in range(start.year, stop.year + 1)
+            for segment in self._runs(y, self.year(y))
+        )
+
+    def holidays(self, start: date, stop: date) -> SegmentSet:
+        """
+        所有休息日（周末和节假日，不含调休上班的日子）。
+        """
+        return SegmentSet(
+            segment
+            for y in range(start.year, stop.year + 1)
+            for segment in self._runs(y, self.year(y) ^ ((1 << (366 if isleap(y) else 365)) - 1))
+        )
+
+    def shift(self, base: date, n: int) -> date:
+        """
+        base 之后（n 为负数时是之前）的第 |n| 个工作日。n 为0时返回 base 。
+
+        整年整年地用位图的 popcount 跳过，只在最后一年里二分查找具体是哪一天。
+        """
+        if n == 0:
+            return base
+        year, index = base.year, self._index(base)
+        if n > 0:
+            bits, offset = self.year(year) >> (index + 1), index + 1
+            while (count := bits.bit_count()) < n:
+                n -= count
+                year += 1
+                bits, offset = self.year(year), 0
+            # 最短的、恰好含有 n 个1的低位前缀
+            lo, hi = 1, bits.bit_length()
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if (bits & ((1 << mid) - 1)).bit_count() >= n:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            return date.fromordinal(date(year, 1, 1).toordinal() + offset + lo - 1)
+
+        n = -n
+        bits = self.year(year) & ((1 << index) - 1)
+        while (count := bits.bit_count()) < n:
+            n -= count
+            year -= 1
+            bits = self.year(year)
+        # 最长的、恰好含有 n 个1的高位后缀
+        lo, hi = 0, bits.bit_length() - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if (bits >> mid).bit_count() >= n:
+                lo = mid
+            else:
+                hi = mid - 1
+        return date.fromordinal(date(year, 1, 1).toordinal() + lo)
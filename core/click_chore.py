@@ -1,7 +1,10 @@
+import csv
+import os
 import re
 import typing
 from configparser import ConfigParser, SectionProxy
 from io import StringIO
+from json import loads as json_loads
 from pathlib import Path
 
 import click
@@ -11,7 +14,10 @@ from rich.style import Style
 from rich.table import Table
 from rich.text import Text
 
+from core.alias import Alias
+from core.schema import Schema, TypedConfigurations, SchemaError, HexAscii, Directory
 from core.style import *
+from core.timing import span
 
 
 def fmt_datasize(size: int) -> str:
@@ -37,6 +43,31 @@ class Regex(click.ParamType):
             self.fail('正则表达式有误。', param, ctx)
 
 
+class IntSet(click.ParamType):
+    name = 'int_set'
+
+    def __init__(self, minimum: int, maximum: int):
+        self._minimum = minimum
+        self._maximum = maximum
+
+    def convert(self, value: str | frozenset, param, ctx) -> frozenset[int]:
+        """
+        解析形如“1,3,5-7”的整数集合。
+        """
+        if isinstance(value, frozenset):
+            return value
+        numbers = set()
+        try:
+            for part in value.split(','):
+                a, _, b = part.partition('-')
+                numbers.update(range(int(a), int(b or a) + 1))
+        except ValueError:
+            self.fail(f'{value!r} 不是形如“1,3,5-7”的整数集合。', param, ctx)
+        if not numbers or min(numbers) < self._minimum or max(numbers) > self._maximum:
+            self.fail(f'每个数都必须在 {self._minimum}~{self._maximum} 之间。', param, ctx)
+        return frozenset(numbers)
+
+
 def warning(*line, nl=True, fg=PT_WARNING):
     click.secho('\n'.join(line), nl=nl, err=True, fg=fg)
 
@@ -53,7 +84,7 @@ def ask(tips: str = None, force: bool = False, dataset=None) -> bool:
             click.echo(tip, err=True, nl=False)
             if input()[:1] != 'Y':
                 return False
-    else:
+    elif force is False:
         tip = tips if tips else '是否继续？(Y/[n]) '
         click.secho(tip, err=True, nl=False, fg=PT_WARNING)
         if input()[:1] != 'Y':
@@ -115,7 +146,8 @@ class AutoReadConfigPaser(ConfigParser):
         return self._proxies[key]
 
     def __enter__(self):
-        self.read(self._cfp, encoding=self._encoding)
+        with span('config'):
+            self.read(self._cfp, encoding=self._encoding)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -126,7 +158,7 @@ class AutoReadConfigPaser(ConfigParser):
         """
         保存到文件中。
         """
-        with open(self._cfp, 'w', encoding='UTF-8') as f:
+        with span('config'), open(self._cfp, 'w', encoding='UTF-8') as f:
             self.write(f)
 
     def gettext(self) -> str:
@@ -137,44 +169,120 @@ class AutoReadConfigPaser(ConfigParser):
             self.write(f)
             return f.getvalue()
 
-    def setdefaults(self, section: str, **kvs) -> typing.NoReturn:
+    def ensure(self, section: str) -> SectionProxy:
+        """
+        获取一个节，不存在时创建它。
+
+        :param section: 节名称。
+        """
+        if section != self.default_section and not self.has_section(section):
+            self.add_section(section)
+        return self._proxies[section]
+
+    def setdefaults(self, section: str, **kvs) -> bool:
         """
         设置多个默认值。
 
         :param section: 节名称。
         :param kvs: 键名称及默认值。
+        :return: 是否有新增的键。
         """
         partition = self[section]
-        for k, v in kvs.items():
-            partition.setdefault(k, v)
+        missing = kvs.keys() - partition.keys()
+        for k in missing:
+            partition[k] = kvs[k]
+        return bool(missing)
+
+
+# YudoConfigs.get 未提供 fallback 时的默认值
+_MISSING = object()
+
+
+def user_cache_path(filename: str) -> Path:
+    """
+    当前用户缓存目录下 yudo 子目录中的文件地址。目录可能尚不存在，写入前需要自行创建。
+
+    Windows 下缓存目录是 %LOCALAPPDATA%，其它系统是 $XDG_CACHE_HOME，缺省为 ~/.cache 。
+    """
+    base = os.environ.get('LOCALAPPDATA' if os.name == 'nt' else 'XDG_CACHE_HOME')
+    return Path(base or Path.home() / '.cache') / 'yudo' / filename
 
 
 class YudoConfigs(AutoReadConfigPaser):
+    PATH: typing.Final = Path(__file__).parent.parent / 'yudo.ini'
+    SCHEMA: typing.Final = Schema(
+        charset={'*': HexAscii()},
+        frp={'path': Directory()},
+        alias={'*': Alias()},
+    )
+    _typed: tuple[int, TypedConfigurations] | None = None
 
     def __init__(self, *args, **kwargs):
-        cfp = Path(__file__).parent.parent / 'yudo.ini'
-        super().__init__(cfp, *args, **kwargs)
+        super().__init__(self.PATH, *args, **kwargs)
 
-    def get(self, section: str, option: str, *, raw=False, variables=None, fallback=object()) -> str:
-        value = super().get(section, option, raw=raw, vars=variables, fallback=fallback)
-        if section == 'charset':
-            try:
-                value = str(bytes.fromhex(value), encoding='ASCII')
-            except ValueError:
-                click.secho('charset 的配置值解码失败。', err=True, fg=PT_ERROR)
-                exit(-1)
-        return value
-
-    def set(self, section: str, option: str, value: str | None = ...) -> None:
-        if section == 'charset':
+    @classmethod
+    def typed(cls) -> TypedConfigurations:
+        """
+        读取按 SCHEMA 转换并校验过的配置。
+
+        文件只在第一次读取或修改过之后才会重新解析，其余时候直接返回缓存。
+        """
+        try:
+            mtime = cls.PATH.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = 0
+        if cls._typed is None or cls._typed[0] != mtime:
+            configs = TypedConfigurations(cls.SCHEMA)
+            with cls() as parser, span('config'):
+                configs.load(parser)
+            cls._typed = mtime, configs
+        return cls._typed[1]
+
+    def get(self, section: str, option: str, *, raw=False, vars=None, fallback=_MISSING) -> str:
+        if fallback is _MISSING:
+            value = super().get(section, option, raw=raw, vars=vars)
+        else:
+            value = super().get(section, option, raw=raw, vars=vars, fallback=fallback)
+        if raw or value is fallback:
+            return value
+        try:
+            return self.SCHEMA.field(section, option).decode(value)
+        except ValueError as e:
+            raise SchemaError(section, option, e)
+
+    def set(self, section: str, option: str, value: str | None = None) -> None:
+        if value is not None:
+            field = self.SCHEMA.field(section, option)
             try:
-                value = bytes(value, encoding='ASCII').hex()
-            except ValueError:
-                click.secho('charset 的配置值不能含有非ASCII字符。', err=True, fg=PT_ERROR)
-                exit(-1)
+                field.convert(value)
+                value = field.encode(value)
+            except ValueError as e:
+                raise SchemaError(section, option, e)
         return super().set(section, option, value)
 
 
+def read_template_params(f: typing.TextIO, fmt: typing.Literal['csv', 'jsonl']) -> typing.Iterator[dict[str, str]]:
+    """
+    逐行读取参数。缺失的值（CSV 中比表头短的行、JSONL 中的 null）不会出现在结果中，
+    以便退回到 -v 等其它来源；CSV 中比表头多出来的值被忽略。
+
+    :param f: CSV（首行是表头）或 JSONL（每行一个对象）文件。
+    :param fmt: 文件格式。
+    :raise ValueError: JSONL 的某一行不是对象。
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(f):
+            yield {k: v for k, v in row.items() if k is not None and v is not None}
+        return
+    for line in f:
+        if not line.strip():
+            continue
+        row = json_loads(line)
+        if not isinstance(row, dict):
+            raise ValueError(f'不是一个 JSON 对象：{line.strip()}')
+        yield {k: str(v) for k, v in row.items() if v is not None}
+
+
 def get_help(self: click.Context) -> typing.NoReturn:
     commands = self.to_info_dict()['command']['commands']
     table = Table('Command', 'Description', box=box.SIMPLE_HEAD, row_styles=MT_ROW)
@@ -28,8 +28,8 @@ class SectionProxy(typing.MutableMapping):
     def __repr__(self) -> str:
         return f'<Section(name="{self._name}")>'
 
-    def __iter__(self) -> typing.KeysView[str]:
-        return self._conf.get_options(self._name)
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._conf.get_options(self._name))
 
     def __len__(self) -> int:
         return len(self._conf.get_options(self._name))
@@ -168,8 +168,8 @@ class Configurations(typing.MutableMapping):
     def __len__(self) -> int:
         return len(self._sections)
 
-    def __iter__(self) -> typing.KeysView[str]:
-        return self._sections.keys()
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._sections)
 
     def keys(self) -> typing.KeysView[str]:
         return self._sections.keys()
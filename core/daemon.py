@@ -0,0 +1,232 @@
+"""
+yudo 的常驻进程（yu --serve）与轻量客户端（yuc.py）。
+
+客户端只依赖标准库：它把命令行、工作目录、环境变量，连同自身的标准输入、输出、错误三个文件描述符
+一起通过 Unix 域套接字发给常驻进程。常驻进程为每个请求 fork 一个子进程，子进程继承了已经导入的
+命令模块、解析好的配置和加载好的数据集，直接在客户端的终端上读写，最后把返回值发回客户端。
+"""
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import typing
+
+from core import timing
+
+HEADER: typing.Final = struct.Struct('!I')
+STATUS: typing.Final = struct.Struct('!i')
+
+# 在常驻进程为请求 fork 出的子进程中为 True
+serving = False
+
+
+def _check_private(path: str, kind: int) -> typing.NoReturn:
+    """
+    :raise PermissionError: path 不是 kind 类型的文件、不属于当前用户，或者其他用户有权访问。
+    """
+    info = os.lstat(path)
+    if stat.S_IFMT(info.st_mode) != kind or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f'{path} 不属于当前用户，或者其他用户有权访问。')
+
+
+def socket_path() -> str:
+    """
+    常驻进程监听的套接字地址。优先使用环境变量 YUDO_SOCKET。
+
+    XDG_RUNTIME_DIR 本身只有当前用户可以访问；没有它时退回到临时目录下一个只属于当前用户的子目录，
+    以免其他用户抢先占用这个地址，冒充常驻进程。
+
+    :raise PermissionError: 临时目录下的子目录不属于当前用户，或者其他用户有权访问。
+    """
+    if path := os.environ.get('YUDO_SOCKET'):
+        return path
+    if directory := os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(directory, f'yudo-{os.getuid()}.sock')
+    directory = os.path.join(tempfile.gettempdir(), f'yudo-{os.getuid()}')
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    _check_private(directory, stat.S_IFDIR)
+    return os.path.join(directory, 'yudo.sock')
+
+
+def _peer_uid(conn: socket.socket) -> int | None:
+    """
+    套接字另一端进程的用户。不支持 SO_PEERCRED 的系统返回 None 。
+    """
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    credentials = struct.Struct('3i')
+    _, uid, _ = credentials.unpack(conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, credentials.size))
+    return uid
+
+
+def replace_process(argv: list[str], executable: str | os.PathLike = None) -> typing.NoReturn:
+    """
+    执行 argv 并以它的返回值退出。通常用 exec 直接替换当前进程，省去一个等待的父进程。
+
+    常驻进程的子进程不能被替换，否则来不及把返回值发回客户端；Windows 的 exec 也不会真正替换当前进程。
+    这两种情况下改为等待命令结束。
+
+    :param executable: 可执行文件的路径。默认在 PATH 中查找 argv[0] 。
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    if serving or os.name != 'posix':
+        sys.exit(subprocess.call(argv, executable=executable))
+    if executable is None:
+        os.execvp(argv[0], argv)
+    os.execv(executable, argv)
+
+
+def _recv_exactly(conn: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        if not (chunk := conn.recv(size - len(data))):
+            raise ConnectionError('connection closed.')
+        data += chunk
+    return data
+
+
+class YudoRequestHandler(socketserver.BaseRequestHandler):
+    # 由 serve() 设置为 click 的根命令组
+    command: typing.Any = None
+
+    def handle(self) -> typing.NoReturn:
+        conn: socket.socket = self.request
+        if _peer_uid(conn) not in (None, os.getuid()):
+            return
+        size, fds, _, _ = socket.recv_fds(conn, HEADER.size, 3)
+        if len(fds) != 3:
+            return
+        request = json.loads(_recv_exactly(conn, HEADER.unpack(size)[0]))
+        conn.sendall(STATUS.pack(os.getpid()))
+
+        # ForkingMixIn 已经 fork 过了，这里是子进程，可以放心替换进程级的状态
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        timing.reset()  # 导入和加载配置的耗时属于常驻进程，不计入这次请求
+        global serving
+        serving = True
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+        try:
+            self.command.main(request['argv'], prog_name='yu', standalone_mode=True)
+            status = 0
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except KeyboardInterrupt:
+            status = 130
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            status = 1
+        finally:
+            for stream in (sys.stdout, sys.stderr):
+                try:
+                    stream.flush()
+                except OSError:
+                    pass
+        conn.sendall(STATUS.pack(status))
+
+
+def _terminate(signum, frame) -> typing.NoReturn:
+    raise KeyboardInterrupt
+
+
+class YudoServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    max_children = 64
+
+
+def serve(
+        command,
+        warmups: typing.Iterable[typing.Callable] = (),
+        ready: typing.Callable[[str], typing.Any] = None,
+) -> typing.NoReturn:
+    """
+    以常驻进程运行，直到收到 SIGINT 或 SIGTERM。
+
+    :param command: click 的根命令组。
+    :param warmups: 启动时预先调用的函数，用于加载配置、数据集等，子进程直接继承其结果。
+    :param ready: 开始监听后以套接字地址调用。
+    :raise FileExistsError: 已有常驻进程在监听同一个地址。
+    :raise PermissionError: 这个地址已被其他用户占用，或者其所在的目录不安全。
+    """
+    path = socket_path()
+    if os.path.lexists(path):
+        _check_private(path, stat.S_IFSOCK)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(path)
+            except OSError:
+                os.unlink(path)  # 上次没有正常退出留下的套接字文件
+            else:
+                raise FileExistsError(path)
+
+    for warmup in warmups:
+        warmup()
+    YudoRequestHandler.command = command
+    old_umask = os.umask(0o177)
+    try:
+        server = YudoServer(path, YudoRequestHandler)
+    finally:
+        os.umask(old_umask)
+    signal.signal(signal.SIGTERM, _terminate)
+    if ready is not None:
+        ready(path)
+    try:
+        with server:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def run_client(argv: list[str]) -> int:
+    """
+    把命令交给常驻进程执行，并返回命令的返回值。
+
+    环境变量和标准输入、输出、错误只会发给属于当前用户的常驻进程：套接字文件必须属于当前用户且其他用户无权访问，
+    支持 SO_PEERCRED 的系统还会核对监听进程的用户。
+
+    :raise ConnectionError: 常驻进程没有运行，或者无法确认它属于当前用户。
+    """
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        path = socket_path()
+        _check_private(path, stat.S_IFSOCK)
+        conn.connect(path)
+        if _peer_uid(conn) not in (None, os.getuid()):
+            raise PermissionError(f'{path} 的监听进程不属于当前用户。')
+    except (FileNotFoundError, ConnectionRefusedError, PermissionError) as e:
+        conn.close()
+        raise ConnectionError(e)
+
+    with conn:
+        body = json.dumps({'argv': argv, 'cwd': os.getcwd(), 'env': dict(os.environ)}).encode()
+        socket.send_fds(conn, [HEADER.pack(len(body))], [0, 1, 2])
+        conn.sendall(body)
+        pid = STATUS.unpack(_recv_exactly(conn, STATUS.size))[0]
+        while True:
+            try:
+                return STATUS.unpack(_recv_exactly(conn, STATUS.size))[0]
+            except KeyboardInterrupt:
+                # 子进程不在终端的前台进程组里，收不到 Ctrl+C，需要客户端转发
+                os.kill(pid, signal.SIGINT)
+            except ConnectionError:
+                return 1
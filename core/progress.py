@@ -0,0 +1,145 @@
+"""
+长时间运行的命令的进度、速度和剩余时间。
+
+标准错误是终端时用 rich 绘制进度条；否则每隔一段时间输出一行 JSON，便于调度系统跟踪任务。
+为了不拖慢热循环，计数按批累加，每批才读一次时钟，并且只在距上次刷新足够久时才刷新。
+运行时间不足 DELAY 秒的任务不会显示任何进度。
+"""
+import json
+import sys
+import time
+import typing
+from itertools import islice
+
+import click
+from rich.console import Console
+from rich.progress import Progress as RichProgress, TextColumn, BarColumn, MofNCompleteColumn, TimeRemainingColumn
+
+from core.click_chore import fmt_datasize
+
+# 由根命令组的 --no-progress 关闭
+enabled = True
+
+DELAY: typing.Final = 1.0
+TTY_INTERVAL: typing.Final = 0.1
+LOG_INTERVAL: typing.Final = 5.0
+BATCH: typing.Final = 4096
+
+
+class Progress(object):
+
+    def __init__(self, label: str, total: int | None = None):
+        """
+        :param label: 任务名称，显示在进度条前，也是 JSON 中 progress 字段的值。
+        :param total: 总行数。无法预先算出时为 None，此时不显示剩余时间。
+        """
+        self.label = label
+        self.total = total
+        self.rows = 0
+        self.bytes = 0
+        self._console = Console(stderr=True)
+        self._tty = self._console.is_terminal
+        self._interval = TTY_INTERVAL if self._tty else LOG_INTERVAL
+        self._rich: RichProgress | None = None
+        self._task = None
+        self._start = self._last = 0.0
+
+    def __enter__(self) -> "Progress":
+        self._start = time.perf_counter()
+        self._last = self._start + DELAY - self._interval
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._rich is not None:
+            self._render(time.perf_counter())
+            self._rich.stop()
+        elif not self._tty and time.perf_counter() - self._start >= DELAY and enabled:
+            self._log(time.perf_counter(), done=exc_type is None)
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self._start
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def advance(self, rows: int, size: int = 0) -> typing.NoReturn:
+        """
+        累加行数和字节数，必要时刷新进度。应当按批调用，而不是每行调用一次。
+        """
+        self.rows += rows
+        self.bytes += size
+        now = time.perf_counter()
+        if now - self._last >= self._interval and enabled:
+            self._last = now
+            if self._tty:
+                self._render(now)
+            else:
+                self._log(now)
+
+    def _eta(self, now: float) -> float | None:
+        elapsed = now - self._start
+        if self.total is None or not self.rows or elapsed <= 0:
+            return None
+        return max(self.total - self.rows, 0) / (self.rows / elapsed)
+
+    def _render(self, now: float) -> typing.NoReturn:
+        if self._rich is None:
+            self._rich = RichProgress(
+                TextColumn('{task.description}'),
+                BarColumn(),
+                MofNCompleteColumn(),
+                TextColumn('{task.fields[rate]} 行/秒'),
+                TextColumn('{task.fields[size]}'),
+                TimeRemainingColumn(),
+                console=self._console,
+                auto_refresh=False,
+            )
+            self._task = self._rich.add_task(self.label, total=self.total, rate='', size='')
+            self._rich.start()
+        elapsed = now - self._start
+        self._rich.update(
+            self._task,
+            completed=self.rows,
+            rate=f'{self.rows / elapsed:,.0f}' if elapsed > 0 else '',
+            size=fmt_datasize(self.bytes) if self.bytes else '',
+        )
+        self._rich.refresh()
+
+    def _log(self, now: float, done: bool = False) -> typing.NoReturn:
+        elapsed = now - self._start
+        eta = self._eta(now)
+        click.echo(json.dumps({
+            'progress': self.label,
+            'rows': self.rows,
+            'total': self.total,
+            'bytes': self.bytes,
+            'rate': round(self.rows / elapsed, 1) if elapsed > 0 else None,
+            'elapsed': round(elapsed, 3),
+            'eta': None if eta is None else round(eta, 3),
+            'done': done,
+        }), err=True)
+
+    def track(self, iterable: typing.Iterable) -> typing.Iterator:
+        """
+        逐个产出 iterable 的元素，同时计数。
+        """
+        iterator = iter(iterable)
+        while batch := tuple(islice(iterator, BATCH)):
+            yield from batch
+            self.advance(len(batch))
+
+    def write(self, lines: typing.Iterable[str], stream: typing.BinaryIO = None) -> typing.NoReturn:
+        """
+        把每一行写到标准输出（或者 stream），同时统计行数和字节数。
+
+        按批编码后直接写入二进制流，既不必先把所有行拼成一个巨大的字符串，也能得到准确的字节数。
+        """
+        if stream is None:
+            sys.stdout.flush()
+            stream = click.get_binary_stream('stdout')
+        encoding = sys.stdout.encoding or 'UTF-8'
+        iterator = iter(lines)
+        while batch := tuple(islice(iterator, BATCH)):
+            data = ('\n'.join(batch) + '\n').encode(encoding, errors='replace')
+            stream.write(data)
+            self.advance(len(batch), len(data))
+        stream.flush()
@@ -0,0 +1,37 @@
+"""
+不展开整个空间的随机抽样。
+
+只要空间的大小能直接算出，并且第 i 个元素能由 i 直接算出（SegmentSet 的下标、多列笛卡尔积的混合进制），
+抽样就只需要生成 n 个互不相同的下标再逐个解码，耗时只与 n 有关，与空间的大小无关。
+"""
+import random
+from typing import Sequence
+
+
+def indices(total: int, n: int, seed: int | None = None) -> list[int]:
+    """
+    从 range(total) 中不重复地抽取 min(n, total) 个下标，从小到大排列，这样输出仍保持穷举时的顺序。
+
+    使用 Floyd 算法，只调用 n 次随机数，total 可以远大于 sys.maxsize。
+
+    :param seed: 随机数种子，相同的种子得到相同的结果。
+    """
+    rng = random.Random(seed)
+    n = min(n, total)
+    chosen = set()
+    for j in range(total - n, total):
+        t = rng.randrange(j + 1)
+        chosen.add(j if t in chosen else t)
+    return sorted(chosen)
+
+
+def unrank(index: int, radices: Sequence[int]) -> tuple[int, ...]:
+    """
+    把下标拆成混合进制的各位。最后一位变化最快，与 itertools.product 的顺序一致。
+
+    :param radices: 每一位的进制，即每一列的元素个数。
+    """
+    digits = [0] * len(radices)
+    for i in range(len(radices) - 1, -1, -1):
+        index, digits[i] = divmod(index, radices[i])
+    return tuple(digits)
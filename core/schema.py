@@ -0,0 +1,156 @@
+import typing
+from configparser import ConfigParser
+from pathlib import Path
+
+from core.config import Configurations, Section
+
+
+class SchemaError(ValueError):
+
+    def __init__(self, section: str, option: str, reason: Exception | str):
+        super().__init__(section, option, reason)
+        self.section = section
+        self.option = option
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f'配置项 {self.section}.{self.option} 无效：{self.reason!s}'
+
+
+class Field(object):
+    """
+    配置项的类型声明。
+
+    配置文件里的文本经过 decode 得到用户可见的文本，再经过 convert 得到 Python 值，
+    最后由 check 做需要访问外部环境（比如文件系统）的校验。
+    """
+
+    def decode(self, text: str) -> str:
+        return text
+
+    def encode(self, text: str) -> str:
+        return text
+
+    def convert(self, text: str) -> typing.Any:
+        return text
+
+    def check(self, value: typing.Any) -> typing.Any:
+        return value
+
+    def load(self, text: str) -> typing.Any:
+        """
+        把配置文件里的文本转换为经过校验的 Python 值。
+
+        :raise ValueError: 无法转换。
+        :raise OSError: 校验不通过。
+        """
+        return self.check(self.convert(self.decode(text)))
+
+
+class String(Field):
+    pass
+
+
+class HexAscii(Field):
+    """以十六进制保存的 ASCII 文本，避免特殊字符破坏 ini 格式。"""
+
+    def decode(self, text: str) -> str:
+        try:
+            return str(bytes.fromhex(text), encoding='ASCII')
+        except ValueError:
+            raise ValueError('不是十六进制编码的ASCII文本。')
+
+    def encode(self, text: str) -> str:
+        try:
+            return bytes(text, encoding='ASCII').hex()
+        except ValueError:
+            raise ValueError('不能含有非ASCII字符。')
+
+
+class Integer(Field):
+
+    def __init__(self, minimum: int = None, maximum: int = None):
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def convert(self, text: str) -> int:
+        try:
+            value = int(text)
+        except ValueError:
+            raise ValueError(f'{text!r} 不是整数。')
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f'不能小于 {self.minimum}。')
+        if self.maximum is not None and value > self.maximum:
+            raise ValueError(f'不能大于 {self.maximum}。')
+        return value
+
+
+class Boolean(Field):
+
+    def convert(self, text: str) -> bool:
+        try:
+            return ConfigParser.BOOLEAN_STATES[text.lower()]
+        except KeyError:
+            raise ValueError(f'{text!r} 不是布尔值。')
+
+
+class Directory(Field):
+
+    def __init__(self, must_exist: bool = True):
+        self.must_exist = must_exist
+
+    def convert(self, text: str) -> Path:
+        return Path(text).expanduser()
+
+    def check(self, value: Path) -> Path:
+        if not self.must_exist:
+            return value
+        if not value.exists():
+            raise FileNotFoundError(value)
+        if not value.is_dir():
+            raise NotADirectoryError(value)
+        return value
+
+
+class Schema(dict):
+    """
+    以节名称为键、{键名称: Field} 为值的类型声明。键名称为 “*” 时匹配该节的所有键。
+    """
+    DEFAULT_FIELD: typing.Final = String()
+
+    def field(self, section: str, option: str) -> Field:
+        options = self.get(section, {})
+        return options.get(option) or options.get('*') or self.DEFAULT_FIELD
+
+
+class TypedConfigurations(Configurations):
+
+    def __init__(self, schema: Schema):
+        """
+        按照 schema 转换过的配置。所有值在 load 时一次性转换并校验，之后直接读取。
+
+        转换失败的配置项不会影响其它配置项，读取它时才抛出 SchemaError。
+        """
+        super().__init__()
+        self._schema = schema
+        self._errors: dict[tuple[str, str], SchemaError] = dict()
+
+    def load(self, parser: ConfigParser) -> typing.NoReturn:
+        for title in parser.sections():
+            section = Section()
+            for option, text in parser.items(title, raw=True):
+                try:
+                    section[option] = self._schema.field(title, option).load(text)
+                except (ValueError, OSError) as e:
+                    self._errors[(title, option)] = SchemaError(title, option, e)
+                    section[option] = None
+            self.setdefault(title, section)
+
+    @property
+    def errors(self) -> list[SchemaError]:
+        return list(self._errors.values())
+
+    def get_option(self, section: str, option: str, default=...) -> typing.Any:
+        if (section, option) in self._errors:
+            raise self._errors[(section, option)]
+        return super().get_option(section, option, default)
@@ -1,6 +1,22 @@
+from array import array
+from bisect import bisect_left, bisect_right
 from datetime import date, timedelta
-from itertools import chain
-from typing import NamedTuple, Any, NoReturn
+from heapq import heapify, heappop, heappush, merge
+from itertools import accumulate, chain, groupby
+from operator import and_, itemgetter, or_, sub, xor
+from typing import NamedTuple, Any, NoReturn, Hashable, Iterable, Iterator, Callable
+
+
+def iter_ticks(origin, unit: timedelta, start: int, stop: int) -> Iterator:
+    """
+    依次产出 origin + unit * t，t 取遍 range(start, stop)。
+
+    整个循环由 map 和 range 在C层面完成，不执行Python字节码；日期按天递增时直接由序数构造。
+    """
+    if type(origin) is date and not unit.seconds and not unit.microseconds:
+        base = origin.toordinal()
+        return map(date.fromordinal, range(base + start * unit.days, base + stop * unit.days, unit.days))
+    return map(origin.__add__, map(unit.__mul__, range(start, stop)))
 
 
 class Segment(NamedTuple):
@@ -9,12 +25,9 @@ class Segment(NamedTuple):
     unit: Any = timedelta(days=1)
 
     def __iter__(self):
-        sign = self.start
-        times = 0
-        while sign < self.stop:
-            sign = self.start + self.unit * times
-            times += 1
-            yield sign
+        if self.stop < self.start:
+            return iter(())
+        return iter_ticks(self.start, self.unit, 0, (self.stop - self.start) // self.unit + 1)
 
     def __or__(self, other):
         assert isinstance(other, self.__class__)
@@ -32,40 +45,332 @@ class Segment(NamedTuple):
         return Segment(self.stop, self.start, self.unit)
 
 
-class SegmentSet:
-    _segments: list[Segment] = []
+class IntervalSet(object):
+    """
+    有序、互不相交的整数半开区间 [start, stop) 的集合。
 
-    def __init__(self, segments: list[Segment]):
-        self._merge(segments)
+    区间的起点和终点分别存放在两个平行的 array 中，相邻或重叠的区间在插入时即合并。
+    """
 
-    def __iter__(self):
-        return chain.from_iterable(self._segments)
+    def __init__(self, intervals: Iterable[tuple[int, int]] = ()):
+        self._starts = array('q')
+        self._stops = array('q')
+        self._offsets: list[int] | None = None
+        for start, stop in intervals:
+            self.add(start, stop)
 
-    def __or__(self, other):
-        if isinstance(other, list):
-            self._merge(other)
-        elif isinstance(other, SegmentSet):
-            self._merge(other._segments)
-        else:
-            raise TypeError()
-        return self
+    @classmethod
+    def _from_sorted(cls, starts: Iterable[int], stops: Iterable[int]) -> "IntervalSet":
+        result = cls()
+        result._starts.extend(starts)
+        result._stops.extend(stops)
+        return result
 
-    def _merge(self, segments: list[Segment]) -> NoReturn:
-        segments += self._segments
-        segments = sorted(segments, key=lambda s: (s[0], s[1]))
-        results = []
-        if not segments:
+    def add(self, start: int, stop: int) -> NoReturn:
+        """
+        插入区间 [start, stop)。二分查找与之重叠或相邻的区间，把它们合并为一个。
+        """
+        if start >= stop:
             return
+        i = bisect_left(self._stops, start)
+        j = bisect_right(self._starts, stop)
+        if i < j:
+            start = min(start, self._starts[i])
+            stop = max(stop, self._stops[j - 1])
+        self._starts[i:j] = array('q', (start,))
+        self._stops[i:j] = array('q', (stop,))
+        self._offsets = None
+
+    def intervals(self) -> Iterator[tuple[int, int]]:
+        return zip(self._starts, self._stops)
+
+    def __iter__(self) -> Iterator[int]:
+        return chain.from_iterable(map(range, self._starts, self._stops))
+
+    def __len__(self) -> int:
+        return self._cumulative()[-1] if self._starts else 0
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, IntervalSet):
+            return NotImplemented
+        return self._starts == other._starts and self._stops == other._stops
+
+    def __repr__(self) -> str:
+        return f'IntervalSet({list(self.intervals())!r})'
+
+    def __contains__(self, item: int) -> bool:
+        i = bisect_right(self._starts, item) - 1
+        return i >= 0 and item < self._stops[i]
+
+    def _cumulative(self) -> list[int]:
+        # 第 i 项是前 i+1 个区间的元素总数
+        if self._offsets is None:
+            self._offsets = list(accumulate(map(sub, self._stops, self._starts)))
+        return self._offsets
+
+    def __getitem__(self, index: int | slice) -> "int | IntervalSet":
+        """
+        按下标取出第 index 小的整数；切片（步长只能为1）得到由这些整数组成的集合。
+        """
+        size = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step != 1:
+                raise ValueError('only slices with step 1 are supported.')
+            if start >= stop:
+                return IntervalSet()
+            return self & IntervalSet([(self[start], self[stop - 1] + 1)])
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError('index out of range.')
+        offsets = self._cumulative()
+        i = bisect_right(offsets, index)
+        return self._starts[i] + index - (offsets[i - 1] if i else 0)
 
-        anchor = segments.pop(0)
+    def _sweep(self, other: "IntervalSet", keep: Callable[[bool, bool], bool]) -> "IntervalSet":
+        # 按顺序扫过两边所有区间的端点，每个端点翻转所在一边的状态，再由 keep 决定结果是否包含这一段
+        def boundaries(intervals: IntervalSet, side: int):
+            for start, stop in intervals.intervals():
+                yield start, side
+                yield stop, side
+
+        inside = [False, False]
+        starts, stops = [], []
+        kept = False
+        events = merge(boundaries(self, 0), boundaries(other, 1))
+        for point, group in groupby(events, key=itemgetter(0)):
+            for _, side in group:
+                inside[side] = not inside[side]
+            if keep(*inside) != kept:
+                kept = not kept
+                (starts if kept else stops).append(point)
+        return self._from_sorted(starts, stops)
+
+    def __or__(self, other: "IntervalSet") -> "IntervalSet":
+        return self._sweep(other, or_)
+
+    def __and__(self, other: "IntervalSet") -> "IntervalSet":
+        return self._sweep(other, and_)
+
+    def __sub__(self, other: "IntervalSet") -> "IntervalSet":
+        return self._sweep(other, lambda a, b: a and not b)
+
+    def __xor__(self, other: "IntervalSet") -> "IntervalSet":
+        return self._sweep(other, xor)
+
+    def complement(self, start: int, stop: int) -> "IntervalSet":
+        """
+        [start, stop) 之中不属于本集合的整数。
+        """
+        return IntervalSet([(start, stop)]) - self
+
+
+class SegmentSet(object):
+
+    def __init__(self, segments: Iterable[Segment] = (), unit: Any = None, origin: Any = None):
+        """
+        由若干 Segment 组成的日期（时间）集合，重叠或相邻的 Segment 自动合并。
+
+        每个值 v 按 (v - origin) // unit 换算成整数刻度存放在 IntervalSet 中，
+        所以并、交、差、补、成员测试和按下标取值都不需要逐个枚举日期。
+
+        :param segments: start <= stop 的 Segment，两端都包含在内。
+        :param unit: 刻度的单位。默认取 Segment 的 unit，所有 Segment 的 unit 必须相同。
+        :param origin: 刻度 0 对应的值。默认取最早的 start，其它值按它对齐。
+        :raise ValueError: Segment 的 unit 不一致。
+        """
+        segments = list(segments)
+        units = {s.unit for s in segments}
+        if unit is None and len(units) > 1:
+            raise ValueError('segments must share the same unit.')
+        self.unit = unit if unit is not None else units.pop() if units else timedelta(days=1)
+        self.origin = origin if origin is not None else min((s.start for s in segments), default=None)
+        self._ticks = IntervalSet()
         for segment in segments:
-            if (union := anchor | segment) is None:
-                results.append(anchor)
-                anchor = segment
-            elif union is anchor:
-                pass
-            else:
-                anchor = union
+            if segment.unit != self.unit:
+                raise ValueError('segments must share the same unit.')
+            self._ticks.add(self._ceil(segment.start), self._floor(segment.stop) + 1)
+
+    def _floor(self, value) -> int:
+        return (value - self.origin) // self.unit
+
+    def _ceil(self, value) -> int:
+        return -((self.origin - value) // self.unit)
+
+    def _value(self, tick: int):
+        return self.origin + self.unit * tick
+
+    def _derive(self, ticks: IntervalSet) -> "SegmentSet":
+        result = SegmentSet(unit=self.unit, origin=self.origin)
+        result._ticks = ticks
+        return result
+
+    def _coerce(self, other: "SegmentSet") -> tuple["SegmentSet", IntervalSet]:
+        # 把另一个集合换算到本集合的刻度上：它的每一段覆盖的值域内、与本集合对齐的值。
+        # 本集合为空、还没有原点时借用另一个集合的刻度，返回的是按这个刻度运算的空集合，本集合不变
+        if not isinstance(other, SegmentSet):
+            raise TypeError(f'unsupported operand type: {other.__class__.__name__}')
+        base = self if self.origin is not None else SegmentSet(unit=other.unit, origin=other.origin)
+        if other.unit == base.unit and other.origin == base.origin or not other._ticks:
+            return base, other._ticks
+        return base, IntervalSet(
+            (base._ceil(other._value(a)), base._floor(other._value(b - 1)) + 1)
+            for a, b in other._ticks.intervals()
+        )
+
+    @property
+    def segments(self) -> list[Segment]:
+        return [
+            Segment(self._value(a), self._value(b - 1), self.unit)
+            for a, b in self._ticks.intervals()
+        ]
+
+    def __iter__(self):
+        return chain.from_iterable(
+            iter_ticks(self.origin, self.unit, a, b)
+            for a, b in self._ticks.intervals()
+        )
+
+    def scaled(self, base: int, scale: int) -> Iterator[int]:
+        """
+        把每个刻度 t 换算为整数 base + t * scale，直接由 range 产出，不构造任何日期对象。
+
+        比如 base 是 origin 的秒级时间戳、scale 是 unit 的秒数时，产出的就是每个值的秒级时间戳。
+        """
+        return chain.from_iterable(
+            range(base + a * scale, base + b * scale, scale)
+            for a, b in self._ticks.intervals()
+        )
+
+    def __len__(self) -> int:
+        return len(self._ticks)
+
+    def __bool__(self) -> bool:
+        return bool(self._ticks)
+
+    def __repr__(self) -> str:
+        return f'SegmentSet({self.segments!r})'
+
+    def __contains__(self, value) -> bool:
+        if self.origin is None:
+            return False
+        tick = self._floor(value)
+        return self._value(tick) == value and tick in self._ticks
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            return self._derive(self._ticks[index])
+        return self._value(self._ticks[index])
+
+    def take(self, indices: Iterable[int]) -> "SegmentSet":
+        """
+        只由这些下标（从小到大排列）上的值组成的集合，刻度不变，因此仍可以用 scaled 换算。
+        """
+        ticks = IntervalSet()
+        for tick in map(self._ticks.__getitem__, indices):
+            ticks.add(tick, tick + 1)
+        return self._derive(ticks)
+
+    def __or__(self, other: "SegmentSet") -> "SegmentSet":
+        base, ticks = self._coerce(other)
+        return base._derive(base._ticks | ticks)
+
+    def __and__(self, other: "SegmentSet") -> "SegmentSet":
+        base, ticks = self._coerce(other)
+        return base._derive(base._ticks & ticks)
+
+    def __sub__(self, other: "SegmentSet") -> "SegmentSet":
+        base, ticks = self._coerce(other)
+        return base._derive(base._ticks - ticks)
+
+    def complement(self, start, stop) -> "SegmentSet":
+        """
+        [start, stop] 之中不属于本集合的值。
+        """
+        base = self if self.origin is not None else SegmentSet(unit=self.unit, origin=start)
+        return base._derive(base._ticks.complement(base._ceil(start), base._floor(stop) + 1))
+
+
+class SpaceSaving(object):
+    """
+    Space-Saving 算法：只用 capacity 个计数器近似统计数据流中的高频元素。
+
+    计数只会偏大，每个元素偏大的上界记录在 errors 里；
+    真实频次超过 总数/capacity 的元素一定会被保留。
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError('capacity must be positive.')
+        self.capacity = capacity
+        self.counts: dict[Hashable, int] = {}
+        self.errors: dict[Hashable, int] = {}
+        self.evicted = False
+        self._heap: list[tuple[int, int, Hashable]] = []
+        self._serial = 0
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self.counts
+
+    def __getitem__(self, item: Hashable) -> int:
+        return self.counts.get(item, 0)
+
+    def _rebuild(self) -> NoReturn:
+        self._heap = [(c, n, i) for n, (i, c) in enumerate(self.counts.items())]
+        self._serial = len(self._heap)
+        heapify(self._heap)
+
+    def _push(self, item: Hashable, count: int) -> NoReturn:
+        # 堆里允许有过期的条目，弹出时再与 counts 核对；堆过大时整体重建
+        self._serial += 1
+        heappush(self._heap, (count, self._serial, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild()
+
+    def add(self, item: Hashable, count: int = 1) -> NoReturn:
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
         else:
-            results.append(anchor)
-        self._segments = results
+            while True:
+                least, _, victim = heappop(self._heap)
+                if counts.get(victim) == least:
+                    break
+            del counts[victim], self.errors[victim]
+            counts[item] = least + count
+            self.errors[item] = least
+            self.evicted = True
+        self._push(item, counts[item])
+
+    def update(self, items: Iterable[Hashable]) -> NoReturn:
+        for item in items:
+            self.add(item)
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        合并另一个概要，计数和误差分别相加后保留计数最大的 capacity 个元素。
+        """
+        counts = dict(self.counts)
+        errors = dict(self.errors)
+        for item, count in other.counts.items():
+            counts[item] = counts.get(item, 0) + count
+            errors[item] = errors.get(item, 0) + other.errors[item]
+        kept = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)[:self.capacity]
+        self.evicted = self.evicted or other.evicted or len(kept) < len(counts)
+        self.counts = dict(kept)
+        self.errors = {item: errors[item] for item in self.counts}
+        self._rebuild()
+        return self
+
+    def most_common(self, n: int = None) -> list[tuple[Hashable, int]]:
+        return sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
@@ -16,6 +16,7 @@ MT_SPECIAL = RichColorName('dark_goldenrod')
 PT_INPUT_TIP = ClickColorName('cyan')
 PT_WARNING = ClickColorName('yellow')
 PT_ERROR = ClickColorName('red')
+PT_SUCCESS = ClickColorName('green')
 PT_SPECIAL = ClickColorName('magenta')
 PT_CONF_SECTION = ClickColorName('yellow')
 PT_CONF_KEY = ClickColorName('cyan')
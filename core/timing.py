@@ -0,0 +1,91 @@
+"""
+各阶段耗时的统计。
+
+用 span(name) 包住一段代码即可把它的耗时计入 name 阶段，也可以当作装饰器使用。
+span 可以嵌套，每个阶段只计自身的耗时（扣除嵌套在其中的其它阶段），所以各阶段之和就是总耗时。
+"""
+import threading
+import time
+import typing
+from contextlib import contextmanager
+
+_totals: dict[str, float] = {}
+_local = threading.local()
+
+
+def _stack() -> list[float]:
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+@contextmanager
+def span(name: str) -> typing.Iterator[None]:
+    """
+    把这段代码的耗时计入 name 阶段。
+
+    :param name: 阶段名称，比如 import、config、dataset、compute、write。
+    """
+    _totals.setdefault(name, 0.0)  # 按开始的顺序排列
+    stack = _stack()
+    stack.append(0.0)  # 嵌套在其中的阶段的耗时
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        _totals[name] += elapsed - nested
+        if stack:
+            stack[-1] += elapsed
+
+
+def add(name: str, seconds: float) -> typing.NoReturn:
+    """
+    直接把一段耗时计入 name 阶段。
+    """
+    _totals[name] = _totals.get(name, 0.0) + seconds
+
+
+def totals() -> dict[str, float]:
+    """
+    各阶段的耗时（秒），按首次开始的顺序排列。
+    """
+    return dict(_totals)
+
+
+def reset() -> typing.NoReturn:
+    _totals.clear()
+    _stack().clear()
+
+
+class TimedStream(object):
+
+    def __init__(self, stream: typing.IO, name: str = 'write'):
+        """
+        把对 stream 的写入计入 name 阶段的代理。文本流的 buffer 同样会被代理。
+        """
+        self._stream = stream
+        self._name = name
+
+    def __getattr__(self, item: str) -> typing.Any:
+        return getattr(self._stream, item)
+
+    @property
+    def buffer(self) -> "TimedStream":
+        return TimedStream(self._stream.buffer, self._name)
+
+    def write(self, data) -> int:
+        with span(self._name):
+            return self._stream.write(data)
+
+    def writelines(self, lines: typing.Iterable) -> typing.NoReturn:
+        # lines 可能是生成器，逐行计时才不会把生成的耗时算作写入
+        for line in lines:
+            self.write(line)
+
+    def flush(self) -> typing.NoReturn:
+        with span(self._name):
+            self._stream.flush()
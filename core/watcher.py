@@ -0,0 +1,159 @@
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import sys
+import time
+import typing
+from pathlib import Path
+
+
+class PollingWatcher(object):
+
+    def __init__(self, path: Path, pattern: str, interval: float = 1.0):
+        """
+        通过定时比对文件的修改时间和大小来监视目录。
+
+        :param path: 被监视的目录。
+        :param pattern: 文件名需要完全匹配的正则表达式。
+        :param interval: 两次比对之间的间隔秒数。
+        """
+        self._path = path
+        self._pattern = re.compile(pattern)
+        self._interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for entry in os.scandir(self._path):
+            if self._pattern.fullmatch(entry.name):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: float | None) -> set[str]:
+        """
+        等待文件变动。
+
+        :param timeout: 最多等待多少秒。None 表示一直等到有变动为止。
+        :return: 发生变动（修改、新建、删除）的文件名。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self._interval if deadline is None else min(self._interval, deadline - time.monotonic())
+            time.sleep(max(delay, 0))
+            snapshot = self._scan()
+            names = {
+                name for name in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(name) != self._snapshot.get(name)
+            }
+            self._snapshot = snapshot
+            if names or (deadline is not None and time.monotonic() >= deadline):
+                return names
+
+    def close(self) -> typing.NoReturn:
+        pass
+
+
+class InotifyWatcher(object):
+    IN_MODIFY: typing.Final = 0x00000002
+    IN_CLOSE_WRITE: typing.Final = 0x00000008
+    IN_MOVED_FROM: typing.Final = 0x00000040
+    IN_MOVED_TO: typing.Final = 0x00000080
+    IN_CREATE: typing.Final = 0x00000100
+    IN_DELETE: typing.Final = 0x00000200
+    EVENT: typing.Final = struct.Struct('iIII')
+
+    def __init__(self, path: Path, pattern: str):
+        """
+        通过 Linux 的 inotify 监视目录。
+
+        :param path: 被监视的目录。
+        :param pattern: 文件名需要完全匹配的正则表达式。
+        :raise OSError: 当前系统不支持 inotify。
+        """
+        self._pattern = re.compile(pattern)
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not supported.')
+        self._fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+        mask = (
+                self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_CREATE
+                | self.IN_DELETE | self.IN_MOVED_FROM | self.IN_MOVED_TO
+        )
+        if libc.inotify_add_watch(self._fd, bytes(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, 'inotify_add_watch', str(path))
+
+    def changes(self, timeout: float | None) -> set[str]:
+        """
+        等待文件变动。
+
+        :param timeout: 最多等待多少秒。None 表示一直等到有变动为止。
+        :return: 发生变动（修改、新建、删除）的文件名。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = None if deadline is None else max(deadline - time.monotonic(), 0)
+            readable, _, _ = select.select([self._fd], [], [], wait)
+            if not readable:
+                return set()
+            names = set()
+            buffer = os.read(self._fd, 64 * 1024)
+            offset = 0
+            while offset < len(buffer):
+                _, _, _, length = self.EVENT.unpack_from(buffer, offset)
+                offset += self.EVENT.size
+                name = buffer[offset:offset + length].rstrip(b'\0').decode(sys.getfilesystemencoding())
+                offset += length
+                if self._pattern.fullmatch(name):
+                    names.add(name)
+            if names:
+                return names
+
+    def close(self) -> typing.NoReturn:
+        os.close(self._fd)
+
+
+def watch(
+        path: Path,
+        pattern: str,
+        debounce: float = 0.5,
+        timeout: float | None = None,
+) -> typing.Iterator[set[str]]:
+    """
+    监视目录内的文件变动，Linux 上使用 inotify，其它系统或 inotify 不可用时轮询。
+
+    一连串密集的变动（比如编辑器保存时的写入、重命名）在静默 debounce 秒后合并为一批产出。
+
+    :param path: 被监视的目录。
+    :param pattern: 文件名需要完全匹配的正则表达式。
+    :param debounce: 静默多少秒后才认为一批变动结束。
+    :param timeout: 每次最多等待多少秒。超时没有变动时产出空集合，便于调用方做其它检查。
+    :return: 每批发生变动的文件名。
+    """
+    watcher = None
+    if sys.platform.startswith('linux'):
+        try:
+            watcher = InotifyWatcher(path, pattern)
+        except OSError:
+            pass
+    if watcher is None:
+        watcher = PollingWatcher(path, pattern, interval=min(debounce, 1.0) or 1.0)
+
+    try:
+        while True:
+            batch = watcher.changes(timeout)
+            while batch and (more := watcher.changes(debounce)):
+                batch |= more
+            yield batch
+    finally:
+        watcher.close()
@@ -10,23 +10,93 @@ r"""
 __version__ = (0, 1, 0, 0xd2ed, 'release')
 __author__ = 'aixcyi'
 
-import click
+import time
 
-import clis
-from core.click_chore import get_help
+from core import timing
+
+# 解释器启动到开始执行本文件所用的CPU时间
+timing.add('startup', time.process_time())
+
+with timing.span('import'):
+    import sys
+
+    import click
+    from rich import box
+    from rich.console import Console
+    from rich.table import Table
+
+    import clis
+    from core import progress
+    from core.click_chore import get_help, YudoConfigs
 
 interfaces = []
 interfaces += clis.interface_list
 
 
+def print_timings():
+    sys.stdout.flush()
+    if isinstance(sys.stdout, timing.TimedStream):
+        sys.stdout = sys.stdout._stream
+    totals = timing.totals()
+    overall = sum(totals.values())
+    table = Table('阶段', '耗时', '占比', box=box.SIMPLE_HEAD)
+    for name, seconds in totals.items():
+        table.add_row(name, f'{seconds * 1000:.1f} ms', f'{seconds / overall:.1%}' if overall else '')
+    table.add_row('total', f'{overall * 1000:.1f} ms', '')
+    Console(stderr=True).print(table)
+
+
+def save_profile(profiler, path: str):
+    profiler.disable()
+    profiler.dump_stats(path)
+    click.secho(f'性能分析结果已保存到 {path} ，可以用 python -m pstats {path} 查看。', err=True)
+
+
+def serve(ctx: click.Context, param, value: bool):
+    if not value or ctx.resilient_parsing:
+        return
+    from core.daemon import serve as serve_forever
+    try:
+        serve_forever(
+            cli,
+            warmups=[YudoConfigs.typed, clis.adcode.warm_up],
+            ready=lambda path: click.secho(f'yudo 常驻进程已启动：{path}', err=True),
+        )
+    except FileExistsError as e:
+        click.secho(f'已有常驻进程在监听 {e.args[0]} 。', err=True, fg='yellow')
+    except PermissionError as e:
+        click.secho(f'无法安全地启动常驻进程：{e}', err=True, fg='red')
+        ctx.exit(1)
+    ctx.exit()
+
+
 @click.group('yu', commands=interfaces)
 @click.help_option('-h', '--help')
 @click.version_option('.'.join(map(str, __version__)), '-v', '--version', message='%(version)s')
-def cli():
-    pass
+@click.option('--serve', is_flag=True, is_eager=True, expose_value=False, callback=serve,
+              help='以常驻进程运行，配合 yuc.py 免去每次启动解释器的开销（仅限类 Unix 系统）。')
+@click.option('--timings', is_flag=True,
+              help='结束后在标准错误输出各阶段（启动、导入、配置、数据集、计算、输出）的耗时。')
+@click.option('--profile', type=click.Path(dir_okay=False, writable=True), metavar='FILE',
+              help='用 cProfile 记录命令的运行情况并保存到 FILE。')
+@click.option('--no-progress', is_flag=True, help='不显示长时间运行的命令的进度。')
+@click.pass_context
+def cli(ctx: click.Context, timings: bool, profile: str | None, no_progress: bool):
+    progress.enabled = not no_progress
+    # 退出时按注册的相反顺序执行：先停止性能分析，再结束计算阶段，最后输出耗时
+    if timings:
+        sys.stdout = timing.TimedStream(sys.stdout)
+        ctx.call_on_close(print_timings)
+    ctx.with_resource(timing.span('compute'))
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        ctx.call_on_close(lambda: save_profile(profiler, profile))
+        profiler.enable()
+
 
+get_help.__doc__ = __doc__
+cli.get_help = get_help
 
 if __name__ == '__main__':
-    get_help.__doc__ = __doc__
-    cli.get_help = get_help
     cli()
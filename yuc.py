@@ -0,0 +1,17 @@
+"""
+yudo 的轻量客户端。
+
+把命令交给 yu --serve 启动的常驻进程执行，省去每次启动解释器、导入命令模块、读取配置的开销；
+常驻进程没有运行时，退回到直接执行 main.py 。
+"""
+import os
+import sys
+
+from core.daemon import run_client
+
+if __name__ == '__main__':
+    try:
+        sys.exit(run_client(sys.argv[1:]))
+    except ConnectionError:
+        main = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+        os.execv(sys.executable, [sys.executable, main, *sys.argv[1:]])